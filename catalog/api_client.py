@@ -1,22 +1,67 @@
 #api_client.py
-import requests
+import config
+from http_cache import ResponseCache
+from http_session import get_shared_session, get_timeout
+from metrics import metrics
 
 # === РОБОТА З API GENSHIN IMPACT ===
 class GenshinAPIClient:
 
-    def __init__(self):
-        self.base_url = "https://genshin.jmp.blue"
+    def __init__(self, base_url=None, session=None, timeout=None, cache=None, use_cache=True):
+        self.base_url = base_url or config.API_BASE_URL
+        self.session = session or get_shared_session()
+        self.timeout = timeout or get_timeout()
+        self.cache = cache or (ResponseCache() if use_cache else None)
+
+    def _get_json(self, url):
+        """
+        GET з дисковим кешем: свіжий запис віддається без запиту,
+        застарілий - перевіряється умовним запитом (ETag / Last-Modified).
+        Повертає (статус, JSON або None, чи змінились дані).
+        """
+        entry = self.cache.get(url) if self.cache else None
+        if entry and self.cache.is_fresh(entry):
+            metrics.inc('api.cache_hits')
+            return entry['status'], entry['body'], False
+
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        with metrics.timer('api.request_ms'):
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        metrics.inc('api.requests')
+        metrics.inc(f'api.status.{response.status_code}')
+
+        if response.status_code == 304 and entry:
+            metrics.inc('api.not_modified')
+            entry = self.cache.refresh(url, entry)
+            return entry['status'], entry['body'], False
+
+        if response.status_code == 200:
+            data = response.json()
+            if self.cache:
+                self.cache.store(url, 200, data, response.headers.get('ETag'),
+                                 response.headers.get('Last-Modified'))
+            return 200, data, True
+
+        # 404 теж кешуємо (з коротшим TTL), щоб не питати про відсутніх персонажів щоразу
+        if response.status_code == 404 and self.cache:
+            self.cache.store(url, 404)
+
+        return response.status_code, None, True
 
     def get_all_character_names(self):
         """Отримання списку усіх імен персонажів"""
         try:
-            url = f"{self.base_url}/characters"
-            response = requests.get(url)
+            status, data, _ = self._get_json(f"{self.base_url}/characters")
 
-            if response.status_code == 200:
-                return response.json()
+            if status == 200:
+                return data
             else:
-                print(f"Помилка: {response.status_code}")
+                print(f"Помилка: {status}")
                 return []
         except Exception as e:
             print(f"Помилка з'єднання: {e}")
@@ -25,25 +70,34 @@ class GenshinAPIClient:
     def get_character_details(self, character_name):
         """Отримання деталей про конкретного персонажа"""
         try:
-            url = f"{self.base_url}/characters/{character_name}"
-            response = requests.get(url)
-
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return None
+            status, data, _ = self._get_json(f"{self.base_url}/characters/{character_name}")
+            return data if status == 200 else None
         except Exception as e:
             print(f"Помилка: {e}")
             return None
 
+    def get_character_details_if_changed(self, character_name):
+        """
+        Деталі персонажа лише тоді, коли API повідомляє про зміни
+        (свіжий запис кешу або відповідь 304 означають "без змін").
+        Повертає (змінилось, деталі).
+        """
+        try:
+            status, data, changed = self._get_json(f"{self.base_url}/characters/{character_name}")
+            return changed, (data if status == 200 else None)
+        except Exception as e:
+            print(f"Помилка: {e}")
+            return True, None
+
 # === ПЕРЕТВОРЮЄМО ДАНІ З API У ОБ'ЄКТИ CHARACTER ===
 class GenshinCharacterParser:
 
     @staticmethod
-    def parse_to_character(api_data, char_id, character_class):
+    def parse_to_character(api_data, char_id, character_class, base_url=None):
         """
         api_data - словник з даними персонажа
         char_id - ID для нашої системи
+        base_url - адреса API, з якого отримано дані (за замовчуванням - з config)
         """
         name = api_data.get('name', 'Unknown')
         vision = api_data.get('vision', 'None')  # Елемент персонажа
@@ -56,5 +110,5 @@ class GenshinCharacterParser:
             char_type=f"{vision} ({weapon})",
             health=rarity * 20,
             attack=rarity * 10,
-            image_url=f"https://genshin.jmp.blue/characters/{name.lower()}/icon"
+            image_url=f"{base_url or config.API_BASE_URL}/characters/{name.lower()}/icon"
         )
\ No newline at end of file
@@ -1,16 +1,153 @@
 #app.py
 import sys
 import os
+import threading
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
-                             QHBoxLayout, QLabel, QPushButton, QScrollArea,
-                             QGridLayout, QFrame, QDialog, QSpinBox, QMessageBox,
-                             QLineEdit, QFormLayout, QComboBox)
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QPixmap, QFont
-
-from main import DataStorage, Character
+                             QHBoxLayout, QLabel, QPushButton, QFrame, QDialog,
+                             QSpinBox, QMessageBox, QLineEdit, QFormLayout, QComboBox,
+                             QCheckBox, QProgressBar, QListView, QStyledItemDelegate, QStyle,
+                             QFileDialog)
+from PyQt5.QtCore import (Qt, QThread, pyqtSignal, QAbstractListModel, QModelIndex,
+                          QRect, QSize, QObject, QRunnable, QThreadPool, QTimer)
+from PyQt5.QtGui import QPixmap, QPixmapCache, QFont, QPainter, QPen, QColor, QImageReader
+
+import config
+from main import create_storage, Character
+from storage import CharacterFilter
 from api_client import GenshinAPIClient, GenshinCharacterParser
+from bundle import BundleImageSource, BundleReader
 from image_manager import ImageManager
+from importer import ImportEngine, ImportResult, ADDED, UPDATED
+from metrics import summary_lines
+
+
+# Значення для панелі фільтрів (як їх віддає API)
+VISIONS = ('Anemo', 'Cryo', 'Dendro', 'Electro', 'Geo', 'Hydro', 'Pyro')
+WEAPONS = ('Bow', 'Catalyst', 'Claymore', 'Polearm', 'Sword')
+
+
+# === ЗОБРАЖЕННЯ ===
+# Обмеження для декодованих мініатюр у пам'яті (найдавніші витісняються)
+QPixmapCache.setCacheLimit(config.PIXMAP_CACHE_KB)
+
+
+def thumbnail_key(path, size):
+    """Ключ QPixmapCache; mtime у ключі - змінений оригінал дає новий запис"""
+    try:
+        mtime = os.path.getmtime(path) if path else None
+    except OSError:
+        return None
+    return f"{path}@{size}@{mtime}" if mtime is not None else None
+
+
+def decode_thumbnail(img_manager, path, size):
+    """
+    Декодує мініатюру в QImage (можна викликати поза UI-потоком).
+    Береться готовий файл мініатюри; якщо його немає - оригінал
+    зменшується ще під час декодування (QImageReader.setScaledSize).
+    """
+    source = img_manager.ensure_thumbnail(path, size) or path
+    reader = QImageReader(source)
+    original = reader.size()
+    if original.isValid() and (original.width() > size or original.height() > size):
+        reader.setScaledSize(original.scaled(size, size, Qt.KeepAspectRatio))
+    return reader.read()
+
+
+def load_thumbnail(img_manager, path, size):
+    """Синхронне завантаження мініатюри через QPixmapCache (для одного зображення)"""
+    key = thumbnail_key(path, size)
+    if key is None:
+        return None
+
+    pixmap = QPixmapCache.find(key)
+    if pixmap is None:
+        image = decode_thumbnail(img_manager, path, size)
+        if image.isNull():
+            return None
+        pixmap = QPixmap.fromImage(image)
+        QPixmapCache.insert(key, pixmap)
+    return pixmap
+
+
+class ThumbnailDecodeTask(QRunnable):
+    """Декодування однієї мініатюри у пулі потоків"""
+
+    def __init__(self, loader, key, character, size):
+        super().__init__()
+        self.loader = loader
+        self.key = key
+        self.character = character
+        self.size = size
+
+    def run(self):
+        image = None
+        path = None
+        try:
+            # Звернення оновлює LRU кешу; витіснене зображення завантажується знову
+            path = self.loader.img_manager.ensure_image(self.character)
+            if path:
+                self.character.local_image_path = path
+                image = decode_thumbnail(self.loader.img_manager, path, self.size)
+        except Exception as e:
+            print(f"Помилка декодування {self.character.local_image_path}: {e}")
+            image = None
+        # Сигнал доставляється в UI-потік через чергу подій
+        self.loader.decoded.emit(self.key, thumbnail_key(path, self.size) or '', image)
+
+
+class ThumbnailLoader(QObject):
+    """
+    Асинхронні мініатюри для сітки: pixmap() одразу повертає готовий pixmap
+    або None (тоді малюється заглушка), а декодування ставиться в чергу пулу.
+    Пізніші запити мають вищий пріоритет, тож картки, що зараз у полі зору,
+    декодуються раніше за ті, які вже прокрутили.
+    """
+    decoded = pyqtSignal(str, str, object)
+    thumbnail_ready = pyqtSignal()
+
+    def __init__(self, img_manager, parent=None):
+        super().__init__(parent)
+        self.img_manager = img_manager
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(2, QThread.idealThreadCount() - 1))
+        self._pending = set()
+        self._failed = set()
+        self._priority = 0
+        self.decoded.connect(self._on_decoded)
+
+    def pixmap(self, character, size):
+        path = character.local_image_path
+        if not path:
+            return None
+        # Файл могли витіснити з кешу - тоді задача завантажить його знову
+        key = thumbnail_key(path, size) or f"{path}@{size}@missing"
+        if key in self._failed:
+            return None
+
+        pixmap = QPixmapCache.find(key)
+        if pixmap is not None:
+            return pixmap
+
+        if key not in self._pending:
+            self._pending.add(key)
+            self._priority += 1
+            self.pool.start(ThumbnailDecodeTask(self, key, character, size), self._priority)
+        return None
+
+    def _on_decoded(self, key, image_key, image):
+        self._pending.discard(key)
+        if image is None or image.isNull():
+            self._failed.add(key)
+            return
+        # QPixmap створюється лише в UI-потоці
+        QPixmapCache.insert(image_key or key, QPixmap.fromImage(image))
+        self.thumbnail_ready.emit()
+
+    def shutdown(self):
+        """Скасовує чергу і чекає завершення поточних декодувань"""
+        self.pool.clear()
+        self.pool.waitForDone()
 
 # === ДОДАВАННЯ ПЕРСОНАЖА ===
 class AddCharacterDialog(QDialog):
@@ -125,7 +262,7 @@ class AddCharacterDialog(QDialog):
             QMessageBox.warning(self, "Помилка", "Введіть ім'я персонажа!")
             return
 
-        char_id = len(self.storage.get_all()) + 1
+        char_id = self.storage.max_id() + 1
         char_type = self.type_combo.currentText()
         health = self.health_input.value()
         attack = self.attack_input.value()
@@ -142,119 +279,321 @@ class AddCharacterDialog(QDialog):
 
         self.accept()
 
-# === КАРТА ПЕРСОНАЖА ===
-class CharacterCard(QFrame):
+# === МОДЕЛЬ СПИСКУ ПЕРСОНАЖІВ ===
+class CharacterListModel(QAbstractListModel):
+    """
+    Модель над сховищем: рядки підвантажуються порціями (canFetchMore / fetchMore),
+    тож навіть великий каталог не читається весь одразу.
+    """
+    CharacterRole = Qt.UserRole + 1
+    FETCH_BATCH = 1000
 
-    def __init__(self, character, on_delete=None, parent=None):
+    def __init__(self, storage, parent=None):
         super().__init__(parent)
-        self.character = character
-        self.on_delete = on_delete
-        self.setup_ui()
+        self.storage = storage
+        # Активний фільтр (None - весь каталог) та кількість знайдених
+        self._filter = None
+        self.match_count = 0
+        self._characters = []
+        # id -> рядок; після видалення рядки від _stale_from перенумеровуються ліниво
+        self._rows = {}
+        self._stale_from = 0
+        # Видалені та оновлені персонажі, яких джерело ще може віддати під час дочитування
+        self._removed = set()
+        self._updated = {}
+        # Додані до завершення дочитування - показуються після решти каталогу
+        self._tail = {}
+        self._source = iter(())
+        # ID, які ще може віддати джерело з фільтром (None - джерело містить весь каталог)
+        self._source_ids = None
+        self._exhausted = True
+
+    def reload(self):
+        """Повне перечитування каталогу"""
+        self.beginResetModel()
+        self._characters = []
+        self._rows = {}
+        self._stale_from = 0
+        self._removed = set()
+        self._updated = {}
+        self._tail = {}
+        if self._filter is None:
+            self._source = self.storage.iter_all()
+            self._source_ids = None
+            self.match_count = self.storage.count()
+        else:
+            # Запит іде за індексами сховища; рядки все одно додаються порціями
+            found = self.storage.query(self._filter)
+            self._source = iter(found)
+            self._source_ids = {char.id for char in found}
+            self.match_count = len(found)
+        self._exhausted = False
+        self.endResetModel()
+
+    def set_filter(self, character_filter):
+        """Показує лише персонажів, що відповідають фільтру (None - весь каталог)"""
+        if character_filter is not None and character_filter.is_empty():
+            character_filter = None
+        self._filter = character_filter
+        self.reload()
+
+    def is_filtered(self):
+        return self._filter is not None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._characters)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        char = self._characters[index.row()]
+        if role == Qt.DisplayRole:
+            return char.name
+        if role == self.CharacterRole:
+            return char
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        batch = []
+        for char in self._source:
+            # Персонаж міг з'явитися раніше через append_character або вже бути видаленим
+            if char.id not in self._rows and char.id not in self._removed:
+                # Знімок джерела старіший за оновлення, що прийшли до дочитування
+                char = self._tail.pop(char.id, None) or self._updated.pop(char.id, char)
+                batch.append(char)
+            if len(batch) >= self.FETCH_BATCH:
+                break
+        else:
+            self._exhausted = True
+            batch.extend(self._tail.values())
+            self._tail = {}
+
+        if batch:
+            self._insert(batch)
+
+    def _insert(self, characters):
+        first = len(self._characters)
+        self.beginInsertRows(QModelIndex(), first, first + len(characters) - 1)
+        self._characters.extend(characters)
+        for row, char in enumerate(characters, first):
+            self._rows[char.id] = row
+        self.endInsertRows()
+
+    def append_character(self, character):
+        """Новий персонаж у кінці списку без скидання моделі"""
+        self._removed.discard(character.id)
+        if self._filter is not None and not self._filter.matches(character):
+            return
+        if character.id in self._rows or character.id in self._tail:
+            return
+        self.match_count += 1
+        if self._exhausted:
+            self._insert([character])
+        else:
+            # Рядки ще не дочитані - новий персонаж з'явиться після них
+            self._tail[character.id] = character
+
+    def _row_of(self, char_id):
+        """Рядок персонажа за O(1); зсунуті видаленнями рядки оновлюються одним проходом"""
+        row = self._rows.get(char_id)
+        if row is None or row < self._stale_from:
+            return row
+        for i in range(self._stale_from, len(self._characters)):
+            self._rows[self._characters[i].id] = i
+        self._stale_from = len(self._characters)
+        return self._rows[char_id]
+
+    def _pending(self, char_id):
+        """Чи віддасть джерело цього персонажа під час дочитування"""
+        return (not self._exhausted and char_id not in self._removed and
+                (self._source_ids is None or char_id in self._source_ids))
+
+    def remove_character(self, char_id):
+        """Прибирає один рядок; решта карток не перемальовується"""
+        self._updated.pop(char_id, None)
+        if self._tail.pop(char_id, None) is not None:
+            self.match_count -= 1
+            return
+        row = self._row_of(char_id)
+        if row is None:
+            # Ще не дочитаний персонаж: джерело не повинно його віддати
+            if self._pending(char_id):
+                self._removed.add(char_id)
+                self.match_count -= 1
+            return
 
-        # Стиль картки
-        self.setFrameStyle(QFrame.Box | QFrame.Raised)
-        self.setLineWidth(2)
-        self.setStyleSheet("""
-            CharacterCard {
-                background-color: #f0f0f0;
-                border: 2px solid #cccccc;
-                border-radius: 10px;
-                padding: 10px;
-            }
-            CharacterCard:hover {
-                background-color: #e8e8e8;
-                border: 2px solid #4a90e2;
-            }
-        """)
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._characters[row]
+        del self._rows[char_id]
+        self._stale_from = min(self._stale_from, row)
+        self.match_count -= 1
+        self.endRemoveRows()
+
+    def update_character(self, character):
+        """Замінює персонажа в його рядку (оновлюється лише ця картка)"""
+        row = self._row_of(character.id)
+        if row is None:
+            matches = self._filter is None or self._filter.matches(character)
+            if character.id in self._tail:
+                if matches:
+                    self._tail[character.id] = character
+                else:
+                    self.remove_character(character.id)
+            elif self._pending(character.id):
+                # Ще не дочитаний: підмінимо застарілий запис джерела під час fetchMore
+                if matches:
+                    self._updated[character.id] = character
+                else:
+                    self.remove_character(character.id)
+            elif matches and character.id not in self._removed:
+                # Після оновлення персонаж почав підходити під фільтр
+                self.append_character(character)
+            return
+        if self._filter is not None and not self._filter.matches(character):
+            # Після оновлення персонаж більше не підходить під фільтр
+            self.remove_character(character.id)
+            return
+        self._characters[row] = character
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
 
-        # Робимо картку клікабельною
-        self.setCursor(Qt.PointingHandCursor)
 
-    def setup_ui(self):
-        """Створення елементів картки"""
-        layout = QVBoxLayout()
+# === МАЛЮВАННЯ КАРТКИ ПЕРСОНАЖА ===
+class CharacterCardDelegate(QStyledItemDelegate):
+    """Картка малюється лише для видимих елементів - віджетів на кожного персонажа немає"""
+    CARD_SIZE = QSize(200, 320)
+    IMAGE_SIZE = 150
 
-        # Зображення
-        image_label = QLabel()
-        image_label.setAlignment(Qt.AlignCenter)
+    def __init__(self, thumbnails, parent=None):
+        super().__init__(parent)
+        self.thumbnails = thumbnails
 
-        if self.character.local_image_path and os.path.exists(self.character.local_image_path):
-            pixmap = QPixmap(self.character.local_image_path)
-            pixmap = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        else:
-            # Placeholder
-            pixmap = QPixmap(150, 150)
-            pixmap.fill(Qt.lightGray)
+    def sizeHint(self, option, index):
+        return self.CARD_SIZE
 
-        image_label.setPixmap(pixmap)
-        layout.addWidget(image_label)
+    @staticmethod
+    def card_rect(rect):
+        return rect.adjusted(2, 2, -2, -2)
 
-        # Ім'я
-        name_label = QLabel(self.character.name)
-        name_label.setFont(QFont('Arial', 12, QFont.Bold))
-        name_label.setAlignment(Qt.AlignCenter)
-        layout.addWidget(name_label)
+    def delete_rect(self, rect):
+        """Область кнопки "Видалити" всередині картки"""
+        card = self.card_rect(rect)
+        return QRect(card.left() + 15, card.bottom() - 45, card.width() - 30, 30)
 
-        # Тип
-        type_label = QLabel(f"🎭 {self.character.type}")
-        type_label.setAlignment(Qt.AlignCenter)
-        type_label.setStyleSheet("color: #555555;")
-        layout.addWidget(type_label)
+    def paint(self, painter, option, index):
+        char = index.data(CharacterListModel.CharacterRole)
+        if char is None:
+            return
 
-        # Статистика
-        stats_layout = QHBoxLayout()
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
 
-        hp_label = QLabel(f"❤️ {self.character.health}")
-        hp_label.setAlignment(Qt.AlignCenter)
-        stats_layout.addWidget(hp_label)
+        # Фон картки
+        card = self.card_rect(option.rect)
+        hovered = bool(option.state & QStyle.State_MouseOver)
+        painter.setPen(QPen(QColor('#4a90e2' if hovered else '#cccccc'), 2))
+        painter.setBrush(QColor('#e8e8e8' if hovered else '#f0f0f0'))
+        painter.drawRoundedRect(card, 10, 10)
 
-        atk_label = QLabel(f"⚔️ {self.character.attack}")
-        atk_label.setAlignment(Qt.AlignCenter)
-        stats_layout.addWidget(atk_label)
+        # Зображення
+        image_rect = QRect(card.left() + (card.width() - self.IMAGE_SIZE) // 2, card.top() + 15,
+                           self.IMAGE_SIZE, self.IMAGE_SIZE)
+        pixmap = self.thumbnails.pixmap(char, self.IMAGE_SIZE)
+        if pixmap is None:
+            # Placeholder (поки зображення декодується або якщо його немає)
+            painter.fillRect(image_rect, Qt.lightGray)
+        else:
+            target = QRect(0, 0, pixmap.width(), pixmap.height())
+            target.moveCenter(image_rect.center())
+            painter.drawPixmap(target, pixmap)
 
-        layout.addLayout(stats_layout)
+        # Ім'я
+        painter.setPen(Qt.black)
+        painter.setFont(QFont('Arial', 12, QFont.Bold))
+        name_rect = QRect(card.left() + 5, image_rect.bottom() + 10, card.width() - 10, 24)
+        painter.drawText(name_rect, Qt.AlignCenter,
+                         painter.fontMetrics().elidedText(char.name, Qt.ElideRight, name_rect.width()))
 
-        # Кнопка видалення
-        if self.on_delete:
-            delete_btn = QPushButton("🗑️ Видалити")
-            delete_btn.clicked.connect(lambda: self.on_delete(self.character))
-            delete_btn.setStyleSheet("""
-                QPushButton {
-                    background-color: #d9534f;
-                    color: white;
-                    padding: 5px;
-                    border: none;
-                    border-radius: 4px;
-                    font-size: 10px;
-                }
-                QPushButton:hover {
-                    background-color: #c9302c;
-                }
-            """)
-            layout.addWidget(delete_btn)
+        # Тип
+        painter.setPen(QColor('#555555'))
+        painter.setFont(option.font)
+        type_rect = QRect(card.left() + 5, name_rect.bottom() + 4, card.width() - 10, 20)
+        painter.drawText(type_rect, Qt.AlignCenter,
+                         painter.fontMetrics().elidedText(f"🎭 {char.type}", Qt.ElideRight, type_rect.width()))
 
-        self.setLayout(layout)
-        self.setFixedSize(200, 320)
+        # Статистика
+        painter.setPen(Qt.black)
+        stats_top = type_rect.bottom() + 6
+        half = card.width() // 2
+        painter.drawText(QRect(card.left(), stats_top, half, 20), Qt.AlignCenter, f"❤️ {char.health}")
+        painter.drawText(QRect(card.left() + half, stats_top, half, 20), Qt.AlignCenter, f"⚔️ {char.attack}")
 
-    def mousePressEvent(self, event):
-        """Обробка кліку"""
-        if event.button() == Qt.LeftButton:
-            # Перевіряємо, чи клік не на кнопці видалення
-            widget = self.childAt(event.pos())
-            if not isinstance(widget, QPushButton):
-                self.show_details()
+        # Кнопка видалення
+        delete_rect = self.delete_rect(option.rect)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QColor('#d9534f'))
+        painter.drawRoundedRect(delete_rect, 4, 4)
+        painter.setPen(Qt.white)
+        font = QFont(option.font)
+        font.setPointSize(9)
+        painter.setFont(font)
+        painter.drawText(delete_rect, Qt.AlignCenter, "🗑️ Видалити")
+
+        painter.restore()
+
+
+# === СІТКА КАРТОК ===
+class CharacterGridView(QListView):
+    """Віртуалізована сітка: QListView в режимі іконок з делегатом карток"""
+    character_clicked = pyqtSignal(object)
+    delete_requested = pyqtSignal(object)
+
+    def __init__(self, img_manager, parent=None):
+        super().__init__(parent)
+        self.setViewMode(QListView.IconMode)
+        self.setResizeMode(QListView.Adjust)
+        self.setMovement(QListView.Static)
+        self.setUniformItemSizes(True)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(500)
+        self.setSpacing(8)
+        self.setSelectionMode(QListView.NoSelection)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.setMouseTracking(True)
+        self.viewport().setAttribute(Qt.WA_Hover)
+        self.viewport().setCursor(Qt.PointingHandCursor)
+        self.setStyleSheet("QListView { border: none; }")
+
+        # Готова мініатюра - перемальовуємо видимі картки (Qt об'єднує оновлення)
+        self.thumbnails = ThumbnailLoader(img_manager, self)
+        self.thumbnails.thumbnail_ready.connect(self.viewport().update)
+
+        self.card_delegate = CharacterCardDelegate(self.thumbnails, self)
+        self.setItemDelegate(self.card_delegate)
+
+    def mouseReleaseEvent(self, event):
+        """Клік по картці - деталі, по кнопці "Видалити" - видалення"""
+        index = self.indexAt(event.pos())
+        if event.button() == Qt.LeftButton and index.isValid():
+            char = index.data(CharacterListModel.CharacterRole)
+            if self.card_delegate.delete_rect(self.visualRect(index)).contains(event.pos()):
+                self.delete_requested.emit(char)
+            else:
+                self.character_clicked.emit(char)
+        super().mouseReleaseEvent(event)
 
-    def show_details(self):
-        """Показ деталей персонажа"""
-        dialog = CharacterDetailsDialog(self.character, self)
-        dialog.exec_()
 
 # === ВІКНО З ДЕТАЛЯМИ ПЕРСОНАЖА ===
 class CharacterDetailsDialog(QDialog):
 
-    def __init__(self, character, parent=None):
+    def __init__(self, character, img_manager, parent=None):
         super().__init__(parent)
         self.character = character
+        self.img_manager = img_manager
         self.setWindowTitle(f"Деталі: {character.name}")
         self.setFixedSize(400, 550)
         self.setup_ui()
@@ -267,10 +606,14 @@ class CharacterDetailsDialog(QDialog):
         image_label = QLabel()
         image_label.setAlignment(Qt.AlignCenter)
 
-        if self.character.local_image_path and os.path.exists(self.character.local_image_path):
-            pixmap = QPixmap(self.character.local_image_path)
-            pixmap = pixmap.scaled(250, 250, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        else:
+        # Перегляд деталей - звернення до зображення (витіснене завантажується знову)
+        self.image_path = None
+        if self.character.local_image_path:
+            self.image_path = self.img_manager.ensure_image(self.character)
+        if self.image_path:
+            self.character.local_image_path = self.image_path
+        pixmap = load_thumbnail(self.img_manager, self.image_path, 250)
+        if pixmap is None:
             pixmap = QPixmap(250, 250)
             pixmap.fill(Qt.lightGray)
 
@@ -319,7 +662,7 @@ class CharacterDetailsDialog(QDialog):
             info_layout.addWidget(url_label)
 
         # Статус зображення
-        if self.character.local_image_path:
+        if self.image_path:
             status_label = QLabel("✅ Зображення збережено локально")
             status_label.setStyleSheet("color: #5cb85c;")
         else:
@@ -357,7 +700,7 @@ class ImportDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Імпорт персонажів")
-        self.setFixedSize(300, 150)
+        self.setFixedSize(300, 200)
         self.count = 5
         self.setup_ui()
 
@@ -378,6 +721,16 @@ class ImportDialog(QDialog):
         self.spinbox.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.spinbox)
 
+        # Дельта-імпорт
+        self.sync_checkbox = QCheckBox("Лише нові персонажі (синхронізація)")
+        self.sync_checkbox.toggled.connect(self.spinbox.setDisabled)
+        layout.addWidget(self.sync_checkbox)
+
+        self.refresh_checkbox = QCheckBox("Оновити змінені")
+        self.refresh_checkbox.setEnabled(False)
+        self.sync_checkbox.toggled.connect(self.refresh_checkbox.setEnabled)
+        layout.addWidget(self.refresh_checkbox)
+
         # Кнопки
         btn_layout = QHBoxLayout()
 
@@ -421,6 +774,72 @@ class ImportDialog(QDialog):
         """Повертає вибрану кількість"""
         return self.spinbox.value()
 
+    def is_sync(self):
+        """Чи вибрано дельта-імпорт"""
+        return self.sync_checkbox.isChecked()
+
+    def is_refresh(self):
+        """Чи перевіряти наявних персонажів на зміни"""
+        return self.is_sync() and self.refresh_checkbox.isChecked()
+
+# === ФОНОВИЙ ІМПОРТ ===
+class ImportWorker(QThread):
+    """
+    Мережа та диск - у фоновому потоці, сховище - лише в головному:
+    кожен готовий персонаж передається сигналом item_ready.
+    """
+    names_loaded = pyqtSignal(list)
+    import_started = pyqtSignal(int)
+    item_ready = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, engine, count, sync=False, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.count = count
+        self.sync = sync
+        self.names = []
+        self.refresh_names = set()
+        self._plan_ready = threading.Event()
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+        self._plan_ready.set()
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def set_plan(self, names, refresh_names=()):
+        """Список для імпорту (дельта-режим планується в головному потоці, бо читає сховище)"""
+        self.names = names
+        self.refresh_names = set(refresh_names)
+        self._plan_ready.set()
+
+    def run(self):
+        names = self.engine.api_client.get_all_character_names()
+        if self._cancelled:
+            return
+        if not names:
+            self.failed.emit("Не вдалося завантажити список персонажів")
+            return
+
+        if self.sync:
+            self.names_loaded.emit(names)
+            self._plan_ready.wait()
+        else:
+            self.set_plan(names[:self.count])
+
+        if self._cancelled:
+            return
+        self.import_started.emit(len(self.names))
+
+        for item in self.engine.iter_import(self.names, self.refresh_names):
+            if self._cancelled:
+                break
+            self.item_ready.emit(item)
+
+
 # === ГОЛОВНЕ ВІКНО ===
 class MainWindow(QMainWindow):
 
@@ -429,10 +848,13 @@ class MainWindow(QMainWindow):
         self.setWindowTitle("Каталог персонажів Genshin Impact")
         self.setMinimumSize(950, 750)
 
-        self.storage = DataStorage()
+        self.storage = create_storage()
         self.api_client = GenshinAPIClient()
         self.parser = GenshinCharacterParser()
-        self.img_manager = ImageManager()
+        # Мініатюри створюються під час імпорту, у робочих потоках
+        self.img_manager = ImageManager(make_thumbnails=True)
+        self.import_worker = None
+        self.import_bundle = None
 
         self.setup_ui()
         self.load_characters()
@@ -464,22 +886,28 @@ class MainWindow(QMainWindow):
         button_layout = QHBoxLayout()
 
         # Кнопка оновлення
-        refresh_btn = QPushButton("🔄 Оновити")
-        refresh_btn.clicked.connect(self.load_characters)
-        refresh_btn.setStyleSheet(self.get_button_style('#5cb85c', '#449d44'))
-        button_layout.addWidget(refresh_btn)
+        self.refresh_btn = QPushButton("🔄 Оновити")
+        self.refresh_btn.clicked.connect(self.load_characters)
+        self.refresh_btn.setStyleSheet(self.get_button_style('#5cb85c', '#449d44'))
+        button_layout.addWidget(self.refresh_btn)
 
         # Кнопка додавання
-        add_btn = QPushButton("➕ Додати персонажа")
-        add_btn.clicked.connect(self.add_character)
-        add_btn.setStyleSheet(self.get_button_style('#5cb85c', '#449d44'))
-        button_layout.addWidget(add_btn)
+        self.add_btn = QPushButton("➕ Додати персонажа")
+        self.add_btn.clicked.connect(self.add_character)
+        self.add_btn.setStyleSheet(self.get_button_style('#5cb85c', '#449d44'))
+        button_layout.addWidget(self.add_btn)
 
         # Кнопка імпорту
-        import_btn = QPushButton("⬇️ Імпорт з API")
-        import_btn.clicked.connect(self.import_characters)
-        import_btn.setStyleSheet(self.get_button_style('#0275d8', '#025aa5'))
-        button_layout.addWidget(import_btn)
+        self.import_btn = QPushButton("⬇️ Імпорт з API")
+        self.import_btn.clicked.connect(self.import_characters)
+        self.import_btn.setStyleSheet(self.get_button_style('#0275d8', '#025aa5'))
+        button_layout.addWidget(self.import_btn)
+
+        # Кнопка імпорту зі знімка (без мережі)
+        self.bundle_btn = QPushButton("📦 Зі знімка")
+        self.bundle_btn.clicked.connect(self.import_from_bundle)
+        self.bundle_btn.setStyleSheet(self.get_button_style('#0275d8', '#025aa5'))
+        button_layout.addWidget(self.bundle_btn)
 
         # Кнопка статистики
         stats_btn = QPushButton("📊 Статистика")
@@ -491,29 +919,110 @@ class MainWindow(QMainWindow):
         button_panel.setLayout(button_layout)
         main_layout.addWidget(button_panel)
 
-        # ОБЛАСТЬ З КАРТКАМИ
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-
-        self.cards_widget = QWidget()
-        self.cards_layout = QGridLayout()
-        self.cards_widget.setLayout(self.cards_layout)
+        # ПАНЕЛЬ ФІЛЬТРІВ
+        filter_panel = QWidget()
+        filter_layout = QHBoxLayout()
+        filter_layout.setContentsMargins(10, 0, 10, 0)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 Пошук за ім'ям")
+        self.search_input.textChanged.connect(self.schedule_filter)
+        filter_layout.addWidget(self.search_input, 2)
+
+        self.vision_filter = QComboBox()
+        self.vision_filter.addItems(["Усі стихії"] + list(VISIONS))
+        self.vision_filter.currentIndexChanged.connect(self.schedule_filter)
+        filter_layout.addWidget(self.vision_filter)
+
+        self.weapon_filter = QComboBox()
+        self.weapon_filter.addItems(["Уся зброя"] + list(WEAPONS))
+        self.weapon_filter.currentIndexChanged.connect(self.schedule_filter)
+        filter_layout.addWidget(self.weapon_filter)
+
+        # 0 - без обмеження
+        self.min_health_filter = QSpinBox()
+        self.min_health_filter.setRange(0, 10000)
+        self.min_health_filter.setPrefix("❤️ від ")
+        self.min_health_filter.valueChanged.connect(self.schedule_filter)
+        filter_layout.addWidget(self.min_health_filter)
+
+        self.min_attack_filter = QSpinBox()
+        self.min_attack_filter.setRange(0, 10000)
+        self.min_attack_filter.setPrefix("⚔️ від ")
+        self.min_attack_filter.valueChanged.connect(self.schedule_filter)
+        filter_layout.addWidget(self.min_attack_filter)
+
+        reset_filter_btn = QPushButton("✖ Скинути")
+        reset_filter_btn.clicked.connect(self.reset_filter)
+        filter_layout.addWidget(reset_filter_btn)
+
+        filter_panel.setLayout(filter_layout)
+        main_layout.addWidget(filter_panel)
+
+        # Фільтр застосовується після паузи у введенні, а не на кожну літеру
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self.apply_filter)
 
-        scroll_area.setWidget(self.cards_widget)
-        main_layout.addWidget(scroll_area)
+        # ОБЛАСТЬ З КАРТКАМИ
+        self.characters_model = CharacterListModel(self.storage, self)
+        self.cards_view = CharacterGridView(self.img_manager)
+        self.cards_view.setModel(self.characters_model)
+        self.cards_view.character_clicked.connect(self.show_character_details)
+        self.cards_view.delete_requested.connect(self.delete_character)
+        main_layout.addWidget(self.cards_view)
+
+        # Порожній список
+        self.empty_label = QLabel(
+            "📭 Немає персонажів\n\nВикористайте:\n'➕ Додати персонажа' для ручного додавання\n'⬇️ Імпорт з API' для завантаження з інтернету")
+        self.empty_label.setFont(QFont('Arial', 13))
+        self.empty_label.setStyleSheet("color: #999999;")
+        self.empty_label.setAlignment(Qt.AlignCenter)
+        self.empty_label.hide()
+        main_layout.addWidget(self.empty_label, 1)
 
         # СТАТУС БАР
+        status_bar = QWidget()
+        status_bar.setStyleSheet("background-color: #f8f9fa;")
+        status_layout = QHBoxLayout()
+        status_layout.setContentsMargins(0, 0, 8, 0)
+
         self.status_label = QLabel("Готово до роботи")
         self.status_label.setStyleSheet("""
-            background-color: #f8f9fa;
             padding: 8px;
             color: #666666;
         """)
-        main_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.status_label, 1)
+
+        # Прогрес імпорту (видно лише під час імпорту)
+        self.import_progress = QProgressBar()
+        self.import_progress.setFixedWidth(250)
+        self.import_progress.hide()
+        status_layout.addWidget(self.import_progress)
+
+        self.cancel_import_btn = QPushButton("✗ Скасувати")
+        self.cancel_import_btn.clicked.connect(self.cancel_import)
+        self.cancel_import_btn.setStyleSheet(self.get_button_style('#d9534f', '#c9302c'))
+        self.cancel_import_btn.hide()
+        status_layout.addWidget(self.cancel_import_btn)
+
+        status_bar.setLayout(status_layout)
+        main_layout.addWidget(status_bar)
 
         central_widget.setLayout(main_layout)
 
+    def closeEvent(self, event):
+        """Закриття вікна: зупиняємо імпорт і зберігаємо відкладені зміни"""
+        if self.import_worker:
+            self.import_worker.cancel()
+            self.import_worker.wait()
+            self.on_import_finished()
+        self.cards_view.thumbnails.shutdown()
+        self.img_manager.flush()
+        self.storage.close()
+        super().closeEvent(event)
+
     def get_button_style(self, bg_color, hover_color):
         """Стиль для кнопок"""
         return f"""
@@ -534,45 +1043,77 @@ class MainWindow(QMainWindow):
             }}
         """
 
-    def clear_cards(self):
-        """Очищення усіх карток"""
-        while self.cards_layout.count():
-            item = self.cards_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-
     def load_characters(self):
         """Завантаження персонажів"""
-        self.clear_cards()
-
-        characters = self.storage.get_all()
-
-        if not characters:
-            # Порожній список
-            no_data = QLabel(
-                "📭 Немає персонажів\n\nВикористайте:\n'➕ Додати персонажа' для ручного додавання\n'⬇️ Імпорт з API' для завантаження з інтернету")
-            no_data.setFont(QFont('Arial', 13))
-            no_data.setStyleSheet("color: #999999;")
-            no_data.setAlignment(Qt.AlignCenter)
-            self.cards_layout.addWidget(no_data, 0, 0, 1, 3)
+        self.characters_model.reload()
+        self.update_load_status()
+
+    def update_load_status(self):
+        """Напис про кількість персонажів (з фільтром - скільки знайдено)"""
+        total = self.storage.count()
+        self.update_empty_state()
+
+        if not total:
             self.status_label.setText("Список порожній")
             return
 
-        # Створюємо картки (3 колонки)
-        row = 0
-        col = 0
-        max_cols = 3
+        if self.characters_model.is_filtered():
+            self.status_label.setText(f"Знайдено {self.characters_model.match_count} з {total} персонажів")
+            return
+
+        self.status_label.setText(f"Завантажено {total} персонажів")
 
-        for char in characters:
-            card = CharacterCard(char, on_delete=self.delete_character)
-            self.cards_layout.addWidget(card, row, col)
+    def schedule_filter(self, *args):
+        self.filter_timer.start()
 
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
+    def current_filter(self):
+        """Умови з панелі фільтрів"""
+        return CharacterFilter(
+            name=self.search_input.text().strip() or None,
+            vision=self.vision_filter.currentText() if self.vision_filter.currentIndex() else None,
+            weapon=self.weapon_filter.currentText() if self.weapon_filter.currentIndex() else None,
+            min_health=self.min_health_filter.value() or None,
+            min_attack=self.min_attack_filter.value() or None
+        )
 
-        self.status_label.setText(f"Завантажено {len(characters)} персонажів")
+    def apply_filter(self):
+        # set_filter сам перечитує модель - другий reload не потрібен
+        self.characters_model.set_filter(self.current_filter())
+        self.update_load_status()
+
+    def reset_filter(self):
+        # Без сигналів - інакше фільтр перезапускався б на кожне поле
+        widgets = (self.search_input, self.vision_filter, self.weapon_filter,
+                   self.min_health_filter, self.min_attack_filter)
+        for widget in widgets:
+            widget.blockSignals(True)
+
+        self.search_input.clear()
+        self.vision_filter.setCurrentIndex(0)
+        self.weapon_filter.setCurrentIndex(0)
+        self.min_health_filter.setValue(0)
+        self.min_attack_filter.setValue(0)
+
+        for widget in widgets:
+            widget.blockSignals(False)
+        self.apply_filter()
+
+    def update_empty_state(self):
+        """Напис "Немає персонажів" замість порожньої сітки"""
+        empty = not self.storage.count()
+        self.empty_label.setVisible(empty)
+        self.cards_view.setVisible(not empty)
+
+    def append_card(self, character):
+        """Додає картку в кінець сітки, не перебудовуючи наявні"""
+        # Поки каталог не дочитаний, модель лише запам'ятовує персонажа
+        self.characters_model.append_character(character)
+        self.update_empty_state()
+
+    def show_character_details(self, character):
+        """Показ деталей персонажа"""
+        dialog = CharacterDetailsDialog(character, self.img_manager, self)
+        dialog.exec_()
 
     def add_character(self):
         """Додавання персонажа"""
@@ -580,12 +1121,13 @@ class MainWindow(QMainWindow):
 
         if dialog.exec_() == QDialog.Accepted and dialog.result:
             self.storage.add_character(dialog.result)
+            self.append_card(dialog.result)
             QMessageBox.information(
                 self,
                 "Успіх",
                 f"Персонаж '{dialog.result.name}' успішно створено!"
             )
-            self.load_characters()
+            self.status_label.setText(f"Додано: {dialog.result.name}")
 
     def delete_character(self, character):
         """Видалення персонажа"""
@@ -599,11 +1141,11 @@ class MainWindow(QMainWindow):
 
         if reply == QMessageBox.Yes:
             # Видаляємо
-            self.storage.characters = [c for c in self.storage.characters if c.id != character.id]
-            self.storage.save()
+            self.storage.delete_by_id(character.id)
 
-            # Оновлюємо
-            self.load_characters()
+            # Прибираємо лише одну картку
+            self.characters_model.remove_character(character.id)
+            self.update_empty_state()
 
             QMessageBox.information(self, "Успіх", f"Персонаж '{character.name}' видалено!")
             self.status_label.setText(f"Видалено: {character.name}")
@@ -614,61 +1156,128 @@ class MainWindow(QMainWindow):
 
         if dialog.exec_() == QDialog.Accepted:
             count = dialog.get_count()
-            self.perform_import(count)
-
-    def perform_import(self, count):
-        """Виконання імпорту"""
-        self.status_label.setText("Завантаження персонажів...")
-        QApplication.processEvents()
-
-        # Отримуємо список
-        character_names = self.api_client.get_all_character_names()
+            self.perform_import(count, sync=dialog.is_sync(), refresh=dialog.is_refresh())
 
-        if not character_names:
-            QMessageBox.critical(self, "Помилка", "Не вдалося завантажити список персонажів")
-            self.status_label.setText("Помилка завантаження")
+    def import_from_bundle(self):
+        """Імпорт усіх персонажів зі знімка (bundle export) - дані та зображення з архіву"""
+        filename, _ = QFileDialog.getOpenFileName(self, "Знімок API", "", "Знімок (*.zip);;Усі файли (*)")
+        if not filename:
             return
 
-        count = min(count, len(character_names))
-        current_max_id = max([c.id for c in self.storage.get_all()], default=0)
+        try:
+            reader = BundleReader(filename)
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Помилка", f"Не вдалося відкрити знімок:\n{e}")
+            return
 
-        imported = 0
-        images_downloaded = 0
+        # Наявні персонажі оновлюються, а не дублюються
+        self.perform_import(len(reader.get_all_character_names()), sync=True, refresh=True,
+                            bundle=reader)
 
-        # Завантажуємо персонажів
-        for i, name in enumerate(character_names[:count]):
-            self.status_label.setText(f"Завантаження {i + 1}/{count}: {name}")
-            QApplication.processEvents()
+    def perform_import(self, count, sync=False, refresh=False, bundle=None):
+        """Запуск імпорту у фоновому потоці (з API або зі знімка bundle)"""
+        self.status_label.setText("Завантаження персонажів...")
 
-            details = self.api_client.get_character_details(name)
-            if details:
-                char = self.parser.parse_to_character(details, current_max_id + i + 1, Character)
+        self.import_bundle = bundle
+        if bundle:
+            self.import_engine = ImportEngine(bundle, self.parser,
+                                              BundleImageSource(bundle, self.img_manager), Character)
+        else:
+            self.import_engine = ImportEngine(self.api_client, self.parser, self.img_manager, Character)
+        self.import_result = ImportResult()
+        self.import_sync = sync
+        self.import_refresh = refresh
+
+        worker = ImportWorker(self.import_engine, count, sync, self)
+        worker.names_loaded.connect(self.plan_import)
+        worker.import_started.connect(self.on_import_started)
+        worker.item_ready.connect(self.on_character_imported)
+        worker.failed.connect(self.on_import_failed)
+        worker.finished.connect(self.on_import_finished)
+        self.import_worker = worker
+
+        # Усі зміни імпорту - одним записом наприкінці
+        self.storage.begin_batch()
+        self.set_import_running(True)
+        worker.start()
+
+    def set_import_running(self, running):
+        """Блокуємо кнопки, що змінюють каталог, і показуємо прогрес"""
+        for btn in (self.refresh_btn, self.add_btn, self.import_btn, self.bundle_btn):
+            btn.setEnabled(not running)
+
+        self.import_progress.setRange(0, 0)
+        self.import_progress.setVisible(running)
+        self.cancel_import_btn.setVisible(running)
+        self.cancel_import_btn.setEnabled(running)
+
+    def plan_import(self, names):
+        """Дельта-імпорт: визначаємо, кого завантажувати (читає сховище - головний потік)"""
+        planned, refresh_names = self.import_engine.plan_sync(names, self.storage, self.import_refresh)
+        self.import_result.skipped = len(names) - len(planned)
+        self.import_worker.set_plan(planned, refresh_names)
+
+    def on_import_started(self, total):
+        self.import_progress.setRange(0, max(total, 1))
+        self.import_progress.setValue(0)
+        self.status_label.setText(f"Завантаження {total} персонажів...")
+
+    def on_character_imported(self, item):
+        """Готовий персонаж: зберігаємо і одразу показуємо картку"""
+        if item.character:
+            outcome = self.import_engine.store(item, self.storage, upsert=self.import_sync)
+            if outcome == ADDED:
+                self.append_card(item.character)
+            elif outcome == UPDATED:
+                self.characters_model.update_character(item.character)
+        self.import_engine.count(item, self.import_result)
+
+        self.import_progress.setValue(item.index)
+        self.status_label.setText(f"Завантаження {item.index}/{item.total}: {item.name}")
+
+    def on_import_failed(self, message):
+        QMessageBox.critical(self, "Помилка", message)
+        self.status_label.setText("Помилка завантаження")
+
+    def cancel_import(self):
+        if self.import_worker:
+            self.import_worker.cancel()
+            self.cancel_import_btn.setEnabled(False)
+            self.status_label.setText("Скасування імпорту...")
+
+    def on_import_finished(self):
+        worker = self.import_worker
+        if worker is None:
+            return
+        self.import_worker = None
+        self.storage.end_batch()
+        self.img_manager.flush()
+        self.set_import_running(False)
 
-                # Завантажуємо зображення
-                local_path = self.img_manager.download_image(char.image_url, char.name)
-                if local_path:
-                    char.local_image_path = local_path
-                    images_downloaded += 1
+        if self.import_bundle:
+            self.import_bundle.close()
+            self.import_bundle = None
 
-                self.storage.add_character(char)
-                imported += 1
+        result = self.import_result
 
-        # Оновлюємо список
-        self.load_characters()
+        if worker.is_cancelled():
+            self.status_label.setText(f"Імпорт скасовано. Імпортовано {result.imported} персонажів")
+            return
 
         # Показуємо результат
         QMessageBox.information(
             self,
             "Імпорт завершено",
-            f"Успішно імпортовано: {imported} персонажів\n"
-            f"Завантажено зображень: {images_downloaded}"
+            f"Успішно імпортовано: {result.imported} персонажів\n"
+            f"Оновлено: {result.updated}, без змін: {result.skipped}\n"
+            f"Завантажено зображень: {result.images_downloaded}"
         )
 
-        self.status_label.setText(f"Імпортовано {imported} персонажів")
+        self.status_label.setText(f"Імпортовано {result.imported} персонажів")
 
     def show_stats(self):
         """Показуємо статистику"""
-        total_chars = len(self.storage.get_all())
+        total_chars = self.storage.count()
         cached_images = self.img_manager.get_cached_image_count()
 
         QMessageBox.information(
@@ -676,8 +1285,10 @@ class MainWindow(QMainWindow):
             "Статистика",
             f"📊 Статистика каталогу\n\n"
             f"Всього персонажів: {total_chars}\n"
-            f"Збережено зображень: {cached_images}\n"
-            f"Папка кешу: {self.img_manager.cache_dir}/"
+            f"Збережено зображень: {cached_images} "
+            f"({self.img_manager.get_cached_bytes() / (1024 * 1024):.1f} МБ)\n"
+            f"Папка кешу: {self.img_manager.cache_dir}/\n\n"
+            f"⏱️ Метрики сеансу\n" + "\n".join(summary_lines())
         )
 
 # === ЗАПУСК ===
@@ -0,0 +1,115 @@
+#async_api_client.py
+import asyncio
+
+import aiohttp
+
+import config
+from http_session import RETRY_STATUSES
+from metrics import metrics
+
+
+# === АСИНХРОННИЙ КЛІЄНТ API GENSHIN IMPACT ===
+class AsyncGenshinAPIClient:
+    """
+    Асинхронний аналог GenshinAPIClient для asyncio:
+    усі запити йдуть через один event loop, без окремого потоку на запит.
+
+        async with AsyncGenshinAPIClient() as client:
+            names = await client.get_all_character_names()
+            async for name, details in client.get_many_details(names):
+                ...
+    """
+
+    def __init__(self, base_url=None, max_concurrency=None, session=None):
+        self.base_url = base_url or config.API_BASE_URL
+        self.max_concurrency = max_concurrency or config.IMPORT_WORKERS
+        self._session = session
+        self._own_session = session is None
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=config.HTTP_POOL_SIZE),
+                timeout=aiohttp.ClientTimeout(connect=config.HTTP_CONNECT_TIMEOUT,
+                                              sock_read=config.HTTP_READ_TIMEOUT)
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and self._own_session:
+            await self._session.close()
+        self._session = None
+
+    async def _get_json(self, url):
+        """
+        GET з повторами при 5xx / обриві з'єднання (пауза backoff * 2^спроба).
+        Повертає (статус, JSON) або (None, None), якщо сервер недоступний.
+        """
+        session = self._get_session()
+
+        for attempt in range(config.HTTP_RETRIES + 1):
+            last_attempt = attempt == config.HTTP_RETRIES
+            try:
+                with metrics.timer('api.request_ms'):
+                    response = await session.get(url)
+                metrics.inc('api.requests')
+                metrics.inc(f'api.status.{response.status}')
+                async with response:
+                    if response.status in RETRY_STATUSES and not last_attempt:
+                        pass
+                    elif response.status == 200:
+                        try:
+                            return response.status, await response.json(content_type=None)
+                        except (ValueError, aiohttp.ContentTypeError, aiohttp.ClientPayloadError) as e:
+                            # Тіло не JSON (або обірване) - як і синхронний клієнт, даних немає
+                            print(f"Некоректна відповідь {url}: {e}")
+                            return response.status, None
+                    else:
+                        return response.status, None
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if last_attempt:
+                    print(f"Помилка з'єднання: {e}")
+                    return None, None
+
+            await asyncio.sleep(config.HTTP_BACKOFF * 2 ** attempt)
+
+    async def get_all_character_names(self):
+        """Отримання списку усіх імен персонажів"""
+        status, data = await self._get_json(f"{self.base_url}/characters")
+        if data is None:
+            if status is not None:
+                print(f"Помилка: {status}")
+            return []
+        return data
+
+    async def get_character_details(self, character_name):
+        """Отримання деталей про конкретного персонажа"""
+        status, data = await self._get_json(f"{self.base_url}/characters/{character_name}")
+        return data
+
+    async def get_many_details(self, names):
+        """
+        Асинхронний генератор пар (ім'я, деталі) у порядку завершення запитів.
+        Одночасно виконується не більше max_concurrency запитів.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(name):
+            async with semaphore:
+                return name, await self.get_character_details(name)
+
+        tasks = [asyncio.ensure_future(fetch(name)) for name in names]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Споживач зупинився раніше - скасовуємо решту запитів
+            for task in tasks:
+                task.cancel()
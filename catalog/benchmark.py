@@ -0,0 +1,245 @@
+#benchmark.py
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import config
+from api_client import GenshinAPIClient, GenshinCharacterParser
+from image_manager import ImageManager
+from importer import ImportEngine
+from jsonl_storage import JsonLinesDataStorage
+from sqlite_storage import SQLiteDataStorage
+from storage import Character, CharacterFilter, DataStorage
+from stub_server import VISIONS, WEAPONS, StubServer
+
+STORAGE_CLASSES = {
+    'json': DataStorage,
+    'sqlite': SQLiteDataStorage,
+    'jsonl': JsonLinesDataStorage,
+}
+
+
+# === СИНТЕТИЧНИЙ КАТАЛОГ ===
+def generate_characters(count, seed=42):
+    """count персонажів з випадковими (але відтворюваними) даними"""
+    rnd = random.Random(seed)
+    return [
+        Character(i, f"Character {i}", f"{rnd.choice(VISIONS)} ({rnd.choice(WEAPONS)})",
+                  rnd.randint(60, 100), rnd.randint(30, 50),
+                  f"https://example.invalid/{i}/icon", '')
+        for i in range(1, count + 1)
+    ]
+
+
+def measure(func, repeat=3):
+    """Найкращий час з repeat запусків (сек) і результат останнього"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+# === СЦЕНАРІЇ ===
+class Benchmark:
+
+    def __init__(self, workdir, repeat=3):
+        self.workdir = workdir
+        self.repeat = repeat
+        self.results = []
+
+    def record(self, scenario, size, seconds, operations=None):
+        operations = operations or size
+        entry = {
+            'scenario': scenario,
+            'size': size,
+            'seconds': round(seconds, 6),
+            'ops_per_sec': round(operations / seconds, 1) if seconds else None
+        }
+        self.results.append(entry)
+        print(f"  {scenario:<28} {size:>9}  {seconds * 1000:>10.2f} мс  "
+              f"{entry['ops_per_sec'] or 0:>12.0f} оп/с")
+
+    def _path(self, name):
+        return os.path.join(self.workdir, name)
+
+    def _fresh(self, *names):
+        for name in names:
+            for suffix in ('', '.idx', '.journal', '-wal', '-shm', '.tmp'):
+                if os.path.exists(self._path(name + suffix)):
+                    os.remove(self._path(name + suffix))
+
+    def storage_scenarios(self, backend, size, characters):
+        """Запис, відкриття, пошук за ID / ім'ям та фільтр для одного сховища"""
+        cls = STORAGE_CLASSES[backend]
+        filename = {'json': 'characters.json', 'sqlite': 'characters.db',
+                    'jsonl': 'characters.jsonl'}[backend]
+        path = self._path(f"{size}-{filename}")
+
+        def open_storage():
+            if backend == 'json':
+                return cls(path)
+            return cls(path, legacy_filename=None)
+
+        def save():
+            self._fresh(os.path.basename(path))
+            storage = open_storage()
+            storage.add_many(Character.from_dict(c.to_dict()) for c in characters)
+            storage.close()
+
+        seconds, _ = measure(save, 1)
+        self.record(f"{backend}.save", size, seconds)
+
+        seconds, storage = measure(open_storage, self.repeat)
+        self.record(f"{backend}.load", size, seconds)
+
+        rnd = random.Random(size)
+        ids = [rnd.randint(1, size) for _ in range(1000)]
+        seconds, _ = measure(lambda: [storage.get_by_id(i) for i in ids], self.repeat)
+        self.record(f"{backend}.get_by_id", size, seconds, len(ids))
+
+        names = [f"Character {i}" for i in ids[:200]]
+        seconds, _ = measure(lambda: [storage.find_by_name(n) for n in names], self.repeat)
+        self.record(f"{backend}.find_by_name", size, seconds, len(names))
+
+        character_filter = CharacterFilter(vision='Pyro', weapon='Bow', min_health=95, min_attack=48)
+        seconds, _ = measure(lambda: storage.query(character_filter), self.repeat)
+        self.record(f"{backend}.query", size, seconds, 1)
+
+        seconds, _ = measure(lambda: list(storage.iter_page('health', 0, 50, True)), self.repeat)
+        self.record(f"{backend}.page_by_health", size, seconds, 1)
+
+        storage.close()
+
+    def import_scenario(self, count, latency, workers):
+        """Повний імпорт з тестового сервера: список, деталі та зображення"""
+        with StubServer(count=count, latency=latency) as server:
+            def run():
+                self._fresh('import.json')
+                images_dir = self._path('import_images')
+                shutil.rmtree(images_dir, ignore_errors=True)
+
+                # Повідомлення про кожне зображення не потрібні
+                with contextlib.redirect_stdout(io.StringIO()):
+                    storage = DataStorage(self._path('import.json'))
+                    engine = ImportEngine(GenshinAPIClient(base_url=server.url, use_cache=False),
+                                          GenshinCharacterParser(),
+                                          ImageManager(cache_dir=images_dir), Character,
+                                          max_workers=workers)
+                    names = engine.api_client.get_all_character_names()
+                    result = engine.run(names, storage)
+                    engine.img_manager.flush()
+                    storage.close()
+                return result
+
+            seconds, result = measure(run, 1)
+
+        self.record(f"import.full(latency={latency * 1000:g}ms)", count, seconds)
+        return result
+
+    def image_cache_scenario(self, size):
+        """Відкриття маніфесту кешу зображень і підрахунок (без читання папки)"""
+        cache_dir = self._path(f"images-{size}")
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = {
+            f"character_{i}": {'hash': f"{i:064x}", 'size': 1000, 'url': '', 'last_access': i}
+            for i in range(size)
+        }
+        with open(os.path.join(cache_dir, 'index.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+
+        seconds, manager = measure(lambda: ImageManager(cache_dir=cache_dir), self.repeat)
+        self.record("images.open_manifest", size, seconds)
+
+        seconds, _ = measure(lambda: [manager.get_cached_image_count() for _ in range(1000)],
+                             self.repeat)
+        self.record("images.count", size, seconds, 1000)
+
+
+# === ПОРІВНЯННЯ З ПОПЕРЕДНІМ ЗАПУСКОМ ===
+def compare(previous, current, threshold):
+    """Друкує зміну часу кожного сценарію; повертає кількість погіршень понад threshold"""
+    old = {(r['scenario'], r['size']): r['seconds'] for r in previous['results']}
+    regressions = 0
+
+    print(f"\n=== Порівняння (поріг {threshold:.0%}) ===")
+    for r in current['results']:
+        before = old.get((r['scenario'], r['size']))
+        if not before:
+            continue
+        change = r['seconds'] / before - 1
+        mark = ''
+        if change > threshold:
+            mark = '  ❌ повільніше'
+            regressions += 1
+        elif change < -threshold:
+            mark = '  ✓ швидше'
+        print(f"  {r['scenario']:<28} {r['size']:>9}  {before * 1000:>10.2f} -> "
+              f"{r['seconds'] * 1000:>10.2f} мс ({change:+.0%}){mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарки сховищ, імпорту та кешу зображень")
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help="розміри каталогу через кому (до 1000000)")
+    parser.add_argument('--backends', default='json,sqlite,jsonl')
+    parser.add_argument('--import-count', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.02, help="затримка тестового API, сек")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="файл результатів попереднього запуску")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="допустиме погіршення при порівнянні (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    backends = [b for b in args.backends.split(',') if b]
+
+    with tempfile.TemporaryDirectory(prefix='catalog-bench-') as workdir:
+        bench = Benchmark(workdir, args.repeat)
+
+        for size in sizes:
+            print(f"\n=== Каталог: {size} персонажів ===")
+            characters = generate_characters(size)
+            for backend in backends:
+                bench.storage_scenarios(backend, size, characters)
+            bench.image_cache_scenario(size)
+
+        if args.import_count:
+            print(f"\n=== Імпорт з тестового API ===")
+            bench.import_scenario(args.import_count, args.latency, config.IMPORT_WORKERS)
+
+    report = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'import_workers': config.IMPORT_WORKERS
+        },
+        'results': bench.results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n✓ Результати збережено: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if compare(previous, report, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
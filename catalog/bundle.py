@@ -0,0 +1,189 @@
+#bundle.py
+import json
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from api_client import GenshinCharacterParser
+from storage import Character
+
+# Версія формату архіву: index.json + characters/<ім'я>.json + images/<sha256>.png
+BUNDLE_FORMAT = 1
+INDEX_NAME = 'index.json'
+CHUNK_SIZE = 64 * 1024
+
+
+# === ЕКСПОРТ ЗНІМКА API ===
+def _fetch_for_bundle(api_client, img_manager, slug):
+    """Деталі + шлях до зображення одного персонажа (у робочому потоці)"""
+    details = api_client.get_character_details(slug)
+    if not details:
+        return None, None
+
+    # Той самий URL зображення, що й під час звичайного імпорту
+    char = GenshinCharacterParser.parse_to_character(details, 0, Character, api_client.base_url)
+    return details, img_manager.download_image(char.image_url, char.name)
+
+
+def export_bundle(filename, api_client, img_manager, names=None, max_workers=None, on_progress=None):
+    """
+    Завантажує дані персонажів та зображення (через кеш img_manager)
+    і пакує їх в один zip-архів для імпорту без мережі.
+    on_progress(номер, всього, ім'я, успіх). Повертає (персонажів, зображень).
+    """
+    if names is None:
+        names = api_client.get_all_character_names()
+    if not names:
+        return 0, 0
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+
+    entries = []
+    images = set()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers or config.IMPORT_WORKERS, len(names)))
+    try:
+        futures = [executor.submit(_fetch_for_bundle, api_client, img_manager, slug) for slug in names]
+
+        with zipfile.ZipFile(tmp_filename, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for i, (slug, future) in enumerate(zip(names, futures)):
+                try:
+                    details, image_path = future.result()
+                except Exception as e:
+                    print(f"Помилка експорту {slug}: {e}")
+                    details, image_path = None, None
+
+                if details:
+                    entry = {'slug': slug, 'name': details.get('name', slug),
+                             'details': f"characters/{slug}.json", 'image': None}
+                    bundle.writestr(entry['details'], json.dumps(details, ensure_ascii=False))
+
+                    if image_path:
+                        # Ім'я об'єкта в кеші - це sha256 вмісту
+                        digest = os.path.splitext(os.path.basename(image_path))[0]
+                        entry.update(image=f"images/{digest}.png", sha256=digest,
+                                     size=os.path.getsize(image_path))
+                        if digest not in images:
+                            # PNG вже стиснутий - зберігаємо як є
+                            bundle.write(image_path, entry['image'], zipfile.ZIP_STORED)
+                            images.add(digest)
+                    entries.append(entry)
+
+                if on_progress:
+                    on_progress(i + 1, len(names), slug, bool(details))
+
+            index = {
+                'format': BUNDLE_FORMAT,
+                'created': time.time(),
+                'source': api_client.base_url,
+                'characters': entries
+            }
+            bundle.writestr(INDEX_NAME, json.dumps(index, ensure_ascii=False, indent=2))
+
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    img_manager.flush()
+    return len(entries), len(images)
+
+
+# === ЧИТАННЯ ЗНІМКА ===
+class BundleReader:
+    """
+    Джерело даних для ImportEngine замість GenshinAPIClient:
+    список і деталі персонажів читаються з архіву, без мережі.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        try:
+            self._zip = zipfile.ZipFile(filename)
+        except zipfile.BadZipFile:
+            raise ValueError(f"{filename}: це не zip-архів")
+        try:
+            index = json.loads(self._zip.read(INDEX_NAME).decode('utf-8'))
+        except (KeyError, ValueError):
+            self._zip.close()
+            raise ValueError(f"{filename}: немає коректного {INDEX_NAME}")
+
+        if index.get('format') != BUNDLE_FORMAT:
+            self._zip.close()
+            raise ValueError(f"{filename}: непідтримувана версія формату {index.get('format')}")
+
+        self.index = index
+        # Посилання на зображення будуються від API, з якого зроблено знімок
+        self.base_url = index.get('source')
+        self._entries = {entry['slug']: entry for entry in index['characters']}
+        # ImageManager шукає зображення за ім'ям персонажа, а не за slug
+        self._images = {entry['name'].lower(): entry for entry in index['characters']
+                        if entry.get('image')}
+
+    def get_all_character_names(self):
+        return list(self._entries)
+
+    def get_character_details(self, character_name):
+        entry = self._entries.get(character_name)
+        if entry is None:
+            return None
+        return json.loads(self._zip.read(entry['details']).decode('utf-8'))
+
+    def get_character_details_if_changed(self, character_name):
+        """Знімок не знає про версії - дані завжди вважаються зміненими (store() порівняє їх сам)"""
+        return True, self.get_character_details(character_name)
+
+    def image_entry(self, character_name):
+        return self._images.get(character_name.lower())
+
+    def open_image(self, entry):
+        return self._zip.open(entry['image'])
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class BundleImageSource:
+    """
+    Замість ImageManager для ImportEngine: download_image бере зображення
+    з архіву і зберігає його у звичайний кеш зображень.
+    """
+
+    def __init__(self, reader, img_manager):
+        self.reader = reader
+        self.img_manager = img_manager
+
+    def download_image(self, image_url, character_name):
+        entry = self.reader.image_entry(character_name)
+        if entry is None:
+            # Без мережі: лише те, що вже є в кеші
+            return self.img_manager.get_local_image_path(character_name)
+
+        if entry['size'] > self.img_manager.max_image_bytes:
+            print(f"  ❌ Зображення завелике: {entry['size']} байт")
+            return None
+
+        try:
+            with self.reader.open_image(entry) as f:
+                return self.img_manager.add_image(character_name, image_url,
+                                                  iter(lambda: f.read(CHUNK_SIZE), b''),
+                                                  entry['sha256'])
+        except Exception as e:
+            print(f"  ❌ Помилка читання зображення з архіву: {e}")
+            return None
+
+    def flush(self):
+        self.img_manager.flush()
@@ -0,0 +1,43 @@
+#config.py
+import os
+
+# === НАЛАШТУВАННЯ КАТАЛОГУ ===
+# Значення можна перевизначити змінними середовища
+
+# Адреса API персонажів (можна вказати локальний тестовий сервер)
+API_BASE_URL = os.environ.get('CATALOG_API_BASE_URL', 'https://genshin.jmp.blue').rstrip('/')
+
+# Кількість паралельних завантажень під час імпорту
+IMPORT_WORKERS = int(os.environ.get('CATALOG_IMPORT_WORKERS', 8))
+
+# Тип сховища: 'json' (один файл), 'journal' (знімок + журнал змін), 'sqlite' або 'jsonl'
+STORAGE_BACKEND = os.environ.get('CATALOG_STORAGE', 'json')
+
+# Розмір журналу (байт), після якого він ущільнюється у новий знімок
+JOURNAL_COMPACT_BYTES = int(os.environ.get('CATALOG_JOURNAL_COMPACT_BYTES', 1024 * 1024))
+
+# Скільки розкодованих записів JSON Lines тримати в пам'яті
+JSONL_CACHE_SIZE = int(os.environ.get('CATALOG_JSONL_CACHE_SIZE', 4096))
+
+# HTTP: розмір пулу з'єднань, таймаути (сек) і повтори при 5xx / обриві з'єднання
+HTTP_POOL_SIZE = int(os.environ.get('CATALOG_HTTP_POOL_SIZE', max(IMPORT_WORKERS, 10)))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('CATALOG_HTTP_CONNECT_TIMEOUT', 3.05))
+HTTP_READ_TIMEOUT = float(os.environ.get('CATALOG_HTTP_READ_TIMEOUT', 10))
+HTTP_RETRIES = int(os.environ.get('CATALOG_HTTP_RETRIES', 3))
+HTTP_BACKOFF = float(os.environ.get('CATALOG_HTTP_BACKOFF', 0.5))
+
+# Дисковий кеш відповідей API: папка, TTL (сек), TTL для 404 та максимальний розмір (байт)
+API_CACHE_DIR = os.environ.get('CATALOG_API_CACHE_DIR', 'api_cache')
+API_CACHE_TTL = float(os.environ.get('CATALOG_API_CACHE_TTL', 24 * 60 * 60))
+API_CACHE_NEGATIVE_TTL = float(os.environ.get('CATALOG_API_CACHE_NEGATIVE_TTL', 60 * 60))
+API_CACHE_MAX_BYTES = int(os.environ.get('CATALOG_API_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+
+# Ліміт QPixmapCache для декодованих мініатюр (КБ)
+PIXMAP_CACHE_KB = int(os.environ.get('CATALOG_PIXMAP_CACHE_KB', 64 * 1024))
+
+# Ліміти кешу зображень: загальний розмір (байт) і кількість (0 - без обмеження)
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('CATALOG_IMAGE_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+IMAGE_CACHE_MAX_ENTRIES = int(os.environ.get('CATALOG_IMAGE_CACHE_MAX_ENTRIES', 0))
+
+# Найбільший розмір одного зображення (байт) - більші завантаження перериваються
+IMAGE_MAX_BYTES = int(os.environ.get('CATALOG_IMAGE_MAX_BYTES', 10 * 1024 * 1024))
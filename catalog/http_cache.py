@@ -0,0 +1,116 @@
+#http_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+# === ДИСКОВИЙ КЕШ ВІДПОВІДЕЙ API ===
+class ResponseCache:
+    """
+    Кеш JSON-відповідей за URL: один файл на URL у cache_dir.
+    Запис зберігає статус, тіло та ETag / Last-Modified для умовних запитів.
+    Розмір обмежено max_bytes - найдавніше використані записи видаляються.
+    """
+
+    def __init__(self, cache_dir=None, ttl=None, negative_ttl=None, max_bytes=None):
+        self.cache_dir = cache_dir or config.API_CACHE_DIR
+        self.ttl = config.API_CACHE_TTL if ttl is None else ttl
+        self.negative_ttl = config.API_CACHE_NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.max_bytes = max_bytes or config.API_CACHE_MAX_BYTES
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Ім'я файлу -> розмір; порядок від давно використаних до недавніх
+        self._sizes = OrderedDict()
+        entries = sorted(os.scandir(self.cache_dir), key=lambda e: e.stat().st_mtime)
+        for entry in entries:
+            if entry.name.endswith('.json'):
+                self._sizes[entry.name] = entry.stat().st_size
+        self.total_bytes = sum(self._sizes.values())
+
+    @staticmethod
+    def _key(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()[:32] + '.json'
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, url):
+        """Запис для URL (навіть застарілий) або None"""
+        key = self._key(url)
+        with self._lock:
+            if key not in self._sizes:
+                return None
+            self._sizes.move_to_end(key)
+
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(self._path(key))
+        except (OSError, ValueError):
+            self._forget(key)
+            return None
+
+        return entry if entry.get('url') == url else None
+
+    def is_fresh(self, entry):
+        """Чи можна віддати запис без звернення до сервера"""
+        ttl = self.ttl if entry['status'] == 200 else self.negative_ttl
+        return time.time() - entry['stored_at'] < ttl
+
+    def store(self, url, status, body=None, etag=None, last_modified=None):
+        entry = {
+            'url': url,
+            'status': status,
+            'body': body,
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time()
+        }
+        key = self._key(url)
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+
+        tmp_path = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            self.total_bytes += len(data) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(data)
+            self._evict()
+
+        return entry
+
+    def refresh(self, url, entry):
+        """Сервер підтвердив (304), що запис актуальний - продовжуємо його TTL"""
+        return self.store(url, entry['status'], entry['body'], entry['etag'], entry['last_modified'])
+
+    def _forget(self, key):
+        with self._lock:
+            self.total_bytes -= self._sizes.pop(key, 0)
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and len(self._sizes) > 1:
+            key, size = self._sizes.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for key in self._sizes:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+            self._sizes.clear()
+            self.total_bytes = 0
@@ -0,0 +1,59 @@
+#http_session.py
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+
+# Помилки сервера, після яких запит варто повторити
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+# === СПІЛЬНА HTTP-СЕСІЯ ===
+def create_session(pool_size=None, retries=None, backoff=None):
+    """
+    Сесія з пулом keep-alive з'єднань і повторами:
+    після 5xx або обриву з'єднання запит повторюється з паузою
+    backoff * 2^(спроба - 1) секунд
+    """
+    pool_size = pool_size or config.HTTP_POOL_SIZE
+    retries = config.HTTP_RETRIES if retries is None else retries
+    backoff = config.HTTP_BACKOFF if backoff is None else backoff
+
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        # Після останньої спроби повертаємо відповідь, а не виняток
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_shared_session = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_session():
+    """Одна сесія на процес - з'єднання перевикористовуються між API та зображеннями"""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
+
+
+def get_timeout():
+    """(connect, read) таймаути для requests"""
+    return (config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT)
@@ -1,53 +1,349 @@
 #image_manager.py
+import hashlib
+import json
 import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
 import requests
 
+import config
+from http_session import get_shared_session, get_timeout
+from metrics import metrics
+from storage import write_json_atomic
+
 
 # === УПРАВЛЯННЯ ЗАВАНТАЖЕННЯМИ ТА ЗБЕРЕЖЕННЯ ЗОБРАЖЕНЬ ===
 class ImageManager:
+    """
+    Зображення зберігаються за вмістом: objects/<sha256>.png, а index.json
+    (маніфест) зв'язує ім'я персонажа з хешем, розміром, URL і часом
+    останнього звернення. Однакові зображення під різними іменами
+    зберігаються один раз; файл з'являється в objects/ лише повністю
+    записаним (тимчасовий файл + os.replace).
+    Розмір кешу обмежено max_bytes / max_entries - найдавніше використані
+    зображення видаляються.
+    """
+
+    # Розміри мініатюр: картка в сітці та вікно деталей
+    THUMBNAIL_SIZES = (150, 250)
 
-    def __init__(self, cache_dir='character_images'):
-        """ cache_dir: назва папки для зберігання зображень """
+    def __init__(self, cache_dir='character_images', session=None, timeout=None,
+                 make_thumbnails=False, max_bytes=None, max_entries=None, max_image_bytes=None):
+        """
+        cache_dir: назва папки для зберігання зображень
+        make_thumbnails: одразу створювати мініатюри для завантажених зображень
+        max_bytes / max_entries: ліміти кешу (0 - без обмеження кількості)
+        max_image_bytes: найбільший дозволений розмір одного зображення
+        """
         self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.thumbs_dir = os.path.join(cache_dir, 'thumbs')
+        self.index_filename = os.path.join(cache_dir, 'index.json')
+        self.session = session or get_shared_session()
+        self.timeout = timeout or get_timeout()
+        self.make_thumbnails = make_thumbnails
+        self.max_bytes = max_bytes or config.IMAGE_CACHE_MAX_BYTES
+        self.max_entries = config.IMAGE_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.max_image_bytes = max_image_bytes or config.IMAGE_MAX_BYTES
+        # Завантаження йдуть паралельно - маніфест змінюється під блокуванням
+        self._lock = threading.Lock()
+        # Зміни маніфесту (нові зображення, час доступу) записуються пізніше - у flush()
+        self._dirty = False
         self._create_cache_directory()
+        self._load_index()
 
     def _create_cache_directory(self):
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
             print(f"✓ Створено папку для зображень: {self.cache_dir}/")
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        # Недописані файли після аварійного завершення
+        for entry in os.scandir(self.objects_dir):
+            if entry.name.endswith('.tmp'):
+                os.remove(entry.path)
+
+    def _load_index(self):
+        """
+        Маніфест: ім'я -> запис, від давно використаних до недавніх.
+        Кількість посилань на кожен об'єкт і загальний розмір рахуються тут один раз.
+        """
+        try:
+            with open(self.index_filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+
+        self._index = OrderedDict()
+        self._refs = {}
+        self.total_bytes = 0
+        for name, entry in sorted(data.items(), key=lambda item: item[1].get('last_access', 0)):
+            entry.setdefault('url', '')
+            entry.setdefault('last_access', 0)
+            self._index[name] = entry
+            self._ref(entry)
+
+        self._adopt_legacy_files()
+
+    def _adopt_legacy_files(self):
+        """
+        Перехід зі старого формату кешу (<ім'я>.png прямо в cache_dir):
+        кожен такий файл один раз переноситься в objects/ і додається до маніфесту.
+        """
+        adopted = 0
+        for file in sorted(os.scandir(self.cache_dir), key=lambda item: item.stat().st_mtime):
+            if not file.is_file() or not file.name.endswith('.png'):
+                continue
+
+            name = file.name[:-len('.png')]
+            if name in self._index:
+                # Ім'я вже є в маніфесті - стара копія більше не потрібна
+                os.remove(file.path)
+                continue
+
+            digest = self._hash_file(file.path)
+            entry = {'hash': digest, 'size': file.stat().st_size, 'url': '',
+                     'last_access': file.stat().st_mtime}
+            if digest in self._refs and self._verify(entry):
+                os.remove(file.path)
+            else:
+                os.replace(file.path, self._object_path(digest))
+            self._index[name] = entry
+            self._ref(entry)
+            adopted += 1
+
+        if adopted:
+            self._evict(self.max_bytes, self.max_entries)
+            self._save_index()
+            print(f"✓ Перенесено зображень зі старого кешу: {adopted}")
+
+    def _ref(self, entry):
+        digest = entry['hash']
+        if digest not in self._refs:
+            self.total_bytes += entry['size']
+        self._refs[digest] = self._refs.get(digest, 0) + 1
+
+    def _unref(self, entry):
+        """Прибирає посилання; файл видаляється, коли на нього не посилається жодне ім'я"""
+        digest = entry['hash']
+        self._refs[digest] -= 1
+        if self._refs[digest]:
+            return
+        del self._refs[digest]
+        self.total_bytes -= entry['size']
+
+        path = self._object_path(digest)
+        for file_path in [path] + [self.get_thumbnail_path(path, size) for size in self.THUMBNAIL_SIZES]:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+    def _touch(self, name, entry):
+        entry['last_access'] = time.time()
+        self._index.move_to_end(name)
+        self._dirty = True
+
+    def _save_index(self):
+        write_json_atomic(self.index_filename, self._index)
+        self._dirty = False
+
+    def flush(self):
+        """Записує маніфест, якщо він змінився (викликається після імпорту та при виході)"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _evict(self, max_bytes, max_entries):
+        # Останнє (щойно використане) зображення залишаємо навіть понад ліміт
+        removed = 0
+        while len(self._index) > 1 and (self.total_bytes > max_bytes or
+                                         (max_entries and len(self._index) > max_entries)):
+            _, entry = self._index.popitem(last=False)
+            self._unref(entry)
+            removed += 1
+        metrics.inc('images.evicted', removed)
+        return removed
+
+    def evict(self, max_bytes=None, max_entries=None):
+        """
+        Видаляє найдавніше використані зображення, поки кеш не вкладеться в ліміти.
+        Повертає (кількість видалених записів, звільнені байти).
+        """
+        with self._lock:
+            before = self.total_bytes
+            removed = self._evict(self.max_bytes if max_bytes is None else max_bytes,
+                                  self.max_entries if max_entries is None else max_entries)
+            if removed:
+                self._save_index()
+            return removed, before - self.total_bytes
+
+    @staticmethod
+    def _safe_name(character_name):
+        return character_name.lower().replace(' ', '_')
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, f"{digest}.png")
+
+    @staticmethod
+    def _hash_file(path):
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                hasher.update(chunk)
+        return hasher.hexdigest()
+
+    def _verify(self, entry, full=False):
+        """Файл об'єкта має розмір з індексу (full=True - ще й той самий хеш)"""
+        path = self._object_path(entry['hash'])
+        try:
+            if os.path.getsize(path) != entry['size']:
+                return False
+        except OSError:
+            return False
+        return not full or self._hash_file(path) == entry['hash']
 
     def get_local_image_path(self, character_name):
-        safe_name = character_name.lower().replace(' ', '_')
-        return os.path.join(self.cache_dir, f"{safe_name}.png")
+        """Шлях до зображення персонажа у сховищі (None, якщо його немає)"""
+        name = self._safe_name(character_name)
+        with self._lock:
+            entry = self._index.get(name)
+            if entry is None:
+                return None
+            self._touch(name, entry)
+            return self._object_path(entry['hash'])
+
+    def ensure_image(self, character):
+        """
+        Зображення персонажа для показу: з кешу (звернення оновлює його місце в LRU),
+        з файлу local_image_path, якщо в маніфесті його ще немає (файл додається до кешу),
+        або, якщо його витіснили чи файл пошкоджено, - завантажене знову за image_url.
+        Повертає шлях або None.
+        """
+        name = self._safe_name(character.name)
+        with self._lock:
+            entry = self._index.get(name)
+            if entry is not None and self._verify(entry):
+                self._touch(name, entry)
+                return self._object_path(entry['hash'])
+
+        local_path = character.local_image_path
+        if entry is None and local_path and os.path.isfile(local_path):
+            try:
+                with open(local_path, 'rb') as f:
+                    local_path = self._store(character.name, character.image_url,
+                                             self._limited(iter(lambda: f.read(64 * 1024), b'')))
+                metrics.inc('images.cache_hits')
+                return local_path
+            except Exception as e:
+                print(f"  ❌ Не вдалося додати {local_path} до кешу: {e}")
+
+        if not character.image_url:
+            return None
+        return self.download_image(character.image_url, character.name)
 
     def image_exists_locally(self, character_name):
-        """ Перевіряє, чи існує зображення локально """
-        local_path = self.get_local_image_path(character_name)
-        return os.path.exists(local_path)
+        """ Перевіряє, чи існує зображення локально (і чи воно не пошкоджене) """
+        entry = self._index.get(self._safe_name(character_name))
+        return entry is not None and self._verify(entry)
+
+    def _store(self, character_name, image_url, chunks):
+        """
+        Записує вміст у тимчасовий файл, рахуючи хеш, і переносить його в objects/.
+        Повертає шлях до об'єкта.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.objects_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        digest = hasher.hexdigest()
+        path = self._object_path(digest)
+        name = self._safe_name(character_name)
+        entry = {'hash': digest, 'size': size, 'url': image_url, 'last_access': time.time()}
+
+        # Під блокуванням: витіснення в іншому потоці не видалить об'єкт,
+        # який ми саме прив'язуємо до імені
+        with self._lock:
+            if digest in self._refs and self._verify(entry):
+                # Таке зображення вже є (інший персонаж) - другої копії не треба
+                os.remove(tmp_path)
+            else:
+                os.replace(tmp_path, path)
+
+            old = self._index.pop(name, None)
+            self._index[name] = entry
+            self._ref(entry)
+            if old is not None:
+                self._unref(old)
+
+            self._evict(self.max_bytes, self.max_entries)
+            # Маніфест записується один раз наприкінці імпорту (flush), а не після кожного файлу
+            self._dirty = True
+        return path
 
     def download_image(self, image_url, character_name):
         """ Завантажує зображення з інтернету та зберігає локально """
-        # Перевіряємо, чи вже є зображення
-        if self.image_exists_locally(character_name):
-            local_path = self.get_local_image_path(character_name)
+        # Перевіряємо, чи вже є зображення (і чи вміст не пошкоджений)
+        name = self._safe_name(character_name)
+        with self._lock:
+            entry = self._index.get(name)
+        # Хеш рахуємо без блокування, тож запис могли витіснити - перевіряємо ще раз
+        cached = entry is not None and self._verify(entry, full=True)
+        if cached:
+            with self._lock:
+                cached = self._index.get(name) is entry
+                if cached:
+                    self._touch(name, entry)
+
+        if cached:
+            metrics.inc('images.cache_hits')
+            local_path = self._object_path(entry['hash'])
             print(f"  ℹ️  Зображення вже існує: {local_path}")
+            self._after_save(local_path)
             return local_path
 
+        metrics.inc('images.cache_misses')
         try:
             print(f"  ⬇️  Завантаження зображення з {image_url}...")
-            response = requests.get(image_url, timeout=10)
+            # stream=True: тіло читається частинами й одразу пишеться на диск
+            with metrics.timer('images.download_ms'), \
+                    self.session.get(image_url, timeout=self.timeout, stream=True) as response:
+                if response.status_code != 200:
+                    print(f"  ❌ Помилка завантаження: HTTP {response.status_code}")
+                    return None
 
-            if response.status_code == 200:
-                local_path = self.get_local_image_path(character_name)
+                content_type = response.headers.get('Content-Type', '')
+                if not content_type.lower().startswith('image/'):
+                    print(f"  ❌ Це не зображення: {content_type or 'тип не вказано'}")
+                    return None
 
-                with open(local_path, 'wb') as f:
-                    f.write(response.content)
+                # Заявлений розмір перевіряємо ще до завантаження тіла
+                length = response.headers.get('Content-Length', '')
+                if length.isdigit() and int(length) > self.max_image_bytes:
+                    print(f"  ❌ Зображення завелике: {length} байт")
+                    return None
 
-                print(f"  ✓ Зображення збережено: {local_path}")
-                return local_path
-            else:
-                print(f"  ❌ Помилка завантаження: HTTP {response.status_code}")
-                return None
+                local_path = self._store(character_name, image_url, self._iter_limited(response))
+
+            print(f"  ✓ Зображення збережено: {local_path}")
+            self._after_save(local_path)
+            return local_path
 
         except requests.exceptions.Timeout:
             print(f"  ❌ Час очікування вичерпано")
@@ -56,14 +352,104 @@ class ImageManager:
             print(f"  ❌ Помилка: {e}")
             return None
 
+    def add_image(self, character_name, image_url, chunks, digest=None):
+        """
+        Зберігає зображення, отримане не з мережі (наприклад, з архіву знімка).
+        Якщо для цього імені вже збережено вміст з хешем digest - нічого не пише.
+        """
+        name = self._safe_name(character_name)
+        # Виклики йдуть з робочих потоків імпорту - маніфест читаємо під блокуванням
+        with self._lock:
+            entry = self._index.get(name)
+            cached = entry is not None and entry['hash'] == digest and self._verify(entry)
+            if cached:
+                self._touch(name, entry)
+
+        if cached:
+            metrics.inc('images.cache_hits')
+            local_path = self._object_path(digest)
+        else:
+            metrics.inc('images.cache_misses')
+            # Ліміт перевіряється на фактично прочитаних байтах, а не на заявленому розмірі
+            local_path = self._store(character_name, image_url, self._limited(chunks))
+
+        self._after_save(local_path)
+        return local_path
+
+    def _limited(self, chunks):
+        """Частини вмісту; запис переривається, щойно перевищено max_image_bytes"""
+        received = 0
+        for chunk in chunks:
+            received += len(chunk)
+            if received > self.max_image_bytes:
+                raise ValueError(f"зображення більше за {self.max_image_bytes} байт")
+            yield chunk
+
+    def _iter_limited(self, response):
+        """Частини тіла відповіді; завантаження переривається, щойно перевищено ліміт"""
+        for chunk in self._limited(response.iter_content(chunk_size=64 * 1024)):
+            metrics.inc('images.bytes_downloaded', len(chunk))
+            yield chunk
+
+    def _after_save(self, local_path):
+        if self.make_thumbnails:
+            for size in self.THUMBNAIL_SIZES:
+                self.ensure_thumbnail(local_path, size)
+
+    # === МІНІАТЮРИ ===
+
+    def get_thumbnail_path(self, image_path, size):
+        # Ім'я об'єкта - хеш вмісту, тож мініатюри теж прив'язані до вмісту
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        return os.path.join(self.thumbs_dir, f"{name}_{size}.png")
+
+    def ensure_thumbnail(self, image_path, size):
+        """
+        Шлях до мініатюри size x size. Мініатюра створюється при першому зверненні
+        і перестворюється, якщо оригінал змінився (новіший за мініатюру).
+        """
+        if not image_path or not os.path.exists(image_path):
+            return None
+
+        thumb_path = self.get_thumbnail_path(image_path, size)
+        try:
+            if os.path.getmtime(thumb_path) >= os.path.getmtime(image_path):
+                return thumb_path
+        except OSError:
+            pass
+
+        return self._make_thumbnail(image_path, thumb_path, size)
+
+    def _make_thumbnail(self, image_path, thumb_path, size):
+        # QImage не потребує QApplication і безпечний у робочих потоках;
+        # імпорт тут, щоб консольна версія не завантажувала Qt без потреби
+        try:
+            from PyQt5.QtCore import Qt
+            from PyQt5.QtGui import QImage
+        except ImportError:
+            return None
+
+        image = QImage(image_path)
+        if image.isNull():
+            return None
+
+        image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+        os.makedirs(self.thumbs_dir, exist_ok=True)
+        # Мініатюру можуть створювати одночасно потік імпорту і пул декодування
+        tmp_path = f"{thumb_path}.{threading.get_ident()}.tmp"
+        if not image.save(tmp_path, 'PNG'):
+            return None
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+
     def get_cached_image_count(self):
-        """ Повертає кількість збережених зображень """
-        if not os.path.exists(self.cache_dir):
-            return 0
+        """ Повертає кількість збережених зображень (з маніфесту, без читання папки) """
+        return len(self._index)
 
-        files = [f for f in os.listdir(self.cache_dir)
-                 if f.endswith('.png') or f.endswith('.jpg')]
-        return len(files)
+    def get_cached_bytes(self):
+        """ Розмір збережених зображень у байтах (кожен об'єкт рахується один раз) """
+        return self.total_bytes
 
     def clear_cache(self):
         """ Видаляє всі кешовані зображення """
@@ -74,6 +460,16 @@ class ImageManager:
         files = os.listdir(self.cache_dir)
         for file in files:
             file_path = os.path.join(self.cache_dir, file)
-            os.remove(file_path)
+            if os.path.isdir(file_path):
+                shutil.rmtree(file_path)
+            else:
+                os.remove(file_path)
+
+        with self._lock:
+            self._index = OrderedDict()
+            self._refs = {}
+            self.total_bytes = 0
+            self._dirty = False
+        os.makedirs(self.objects_dir, exist_ok=True)
 
         print(f"✓ Видалено {len(files)} файлів з кешу")
\ No newline at end of file
@@ -0,0 +1,190 @@
+#importer.py
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+# Що сталося з персонажем під час збереження
+ADDED = 'added'
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+
+
+# === РЕЗУЛЬТАТ ОБРОБКИ ОДНОГО ПЕРСОНАЖА ===
+class ImportItem:
+    def __init__(self, index, total, name, character=None, image_downloaded=False, unchanged=False):
+        self.index = index
+        self.total = total
+        self.name = name
+        self.character = character
+        self.image_downloaded = image_downloaded
+        # API повідомило, що дані не змінились - запит деталей не знадобився
+        self.unchanged = unchanged
+        # ADDED / UPDATED / UNCHANGED після збереження
+        self.outcome = None
+
+
+# === ПІДСУМОК ІМПОРТУ ===
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.updated = 0
+        self.skipped = 0
+        self.images_downloaded = 0
+
+
+# === ПАРАЛЕЛЬНИЙ ІМПОРТ ПЕРСОНАЖІВ ===
+class ImportEngine:
+
+    def __init__(self, api_client, parser, img_manager, character_class, max_workers=None):
+        self.api_client = api_client
+        self.parser = parser
+        self.img_manager = img_manager
+        self.character_class = character_class
+        self.max_workers = max_workers or config.IMPORT_WORKERS
+
+    @staticmethod
+    def _name_from_slug(slug):
+        """'hu-tao' -> 'hu tao' (пошук за ім'ям у сховищі не залежить від регістру)"""
+        return slug.replace('-', ' ').replace('_', ' ')
+
+    @classmethod
+    def _find_existing(cls, storage, slug, name=None):
+        """
+        Персонаж каталогу для slug з API. Записи, імпортовані до появи slug,
+        шукаються за ім'ям - лише серед тих, у кого slug ще не заданий.
+        """
+        char = storage.find_by_slug(slug)
+        if char is not None:
+            return char
+        legacy = [c for c in storage.find_by_name(name or cls._name_from_slug(slug)) if not c.slug]
+        return legacy[0] if legacy else None
+
+    def plan_sync(self, names, storage, refresh=False):
+        """
+        Дельта-імпорт: порівнює slug зі списку API з slug у сховищі.
+        Повертає (імена для завантаження, імена, які треба лише перевірити на зміни).
+        Без refresh наявні персонажі не запитуються взагалі.
+        """
+        missing = []
+        existing = []
+        for name in names:
+            if self._find_existing(storage, name) is not None:
+                existing.append(name)
+            else:
+                missing.append(name)
+
+        if not refresh:
+            return missing, set()
+        return missing + existing, set(existing)
+
+    def _fetch(self, name, only_if_changed=False):
+        """Деталі + зображення одного персонажа (виконується у робочому потоці)"""
+        if only_if_changed:
+            changed, details = self.api_client.get_character_details_if_changed(name)
+            if not changed:
+                return None, False, True
+        else:
+            details = self.api_client.get_character_details(name)
+
+        if not details:
+            return None, False, False
+
+        char = self.parser.parse_to_character(details, 0, self.character_class,
+                                              getattr(self.api_client, 'base_url', None))
+        char.slug = name
+
+        local_path = self.img_manager.download_image(char.image_url, char.name)
+        if local_path:
+            char.local_image_path = local_path
+
+        return char, bool(local_path), False
+
+    def iter_import(self, names, refresh_names=()):
+        """
+        Завантажує персонажів паралельно, але віддає результати
+        у порядку списку names. ID призначає store() під час збереження.
+        Для імен з refresh_names деталі запитуються лише якщо вони змінились.
+        """
+        total = len(names)
+        if not total:
+            return
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, total))
+        try:
+            futures = [executor.submit(self._fetch, name, name in refresh_names) for name in names]
+
+            for i, (name, future) in enumerate(zip(names, futures)):
+                try:
+                    char, image_downloaded, unchanged = future.result()
+                except Exception as e:
+                    print(f"Помилка імпорту {name}: {e}")
+                    char, image_downloaded, unchanged = None, False, False
+
+                yield ImportItem(i + 1, total, name, char, image_downloaded, unchanged)
+        finally:
+            # Якщо імпорт перервали - не чекаємо решту завдань
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def store(self, item, storage, upsert=False):
+        """
+        Зберігає персонажа з item. Новий отримує наступний вільний ID;
+        з upsert персонаж з таким самим slug оновлюється замість дублювання.
+        """
+        char = item.character
+
+        if upsert:
+            old = self._find_existing(storage, char.slug, char.name)
+            if old is not None:
+                char.id = old.id
+                if not char.local_image_path:
+                    char.local_image_path = old.local_image_path
+
+                if char.to_dict() == old.to_dict():
+                    item.outcome = UNCHANGED
+                else:
+                    storage.update_character(char)
+                    item.outcome = UPDATED
+                return item.outcome
+
+        char.id = storage.max_id() + 1
+        storage.add_character(char)
+        item.outcome = ADDED
+        return item.outcome
+
+    @staticmethod
+    def count(item, result):
+        """Додає результат обробки item до підсумку"""
+        if item.outcome == ADDED:
+            result.imported += 1
+        elif item.outcome == UPDATED:
+            result.updated += 1
+        elif item.unchanged or item.outcome == UNCHANGED:
+            result.skipped += 1
+
+        if item.character and item.image_downloaded:
+            result.images_downloaded += 1
+
+    def run(self, names, storage, on_progress=None, sync=False, refresh=False):
+        """
+        Імпорт з додаванням у сховище та звітом про кожного персонажа.
+        sync=True - дельта-режим: завантажуються лише відсутні в каталозі
+        персонажі (з refresh - ще й змінені), наявні оновлюються, а не дублюються.
+        """
+        result = ImportResult()
+        refresh_names = set()
+        if sync:
+            total = len(names)
+            names, refresh_names = self.plan_sync(names, storage, refresh)
+            result.skipped = total - len(names)
+
+        # Один запис на диск за весь імпорт
+        with storage.batch():
+            for item in self.iter_import(names, refresh_names):
+                if item.character:
+                    self.store(item, storage, upsert=sync)
+                self.count(item, result)
+
+                if on_progress:
+                    on_progress(item)
+
+        return result
@@ -0,0 +1,348 @@
+#jsonl_storage.py
+import heapq
+import json
+import os
+from array import array
+from collections import OrderedDict
+
+import config
+from storage import Character, IStorage, normalize_name
+
+
+def migrate_json_to_jsonl(json_filename, jsonl_filename):
+    """
+    Одноразове перенесення characters.json у формат JSON Lines.
+    Повтор ID у JSONL означає оновлення, тож дублікати ID (з попередніх версій
+    каталогу) отримують нові ID - як у DataStorage, а не зникають.
+    """
+    with open(json_filename, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    seen = set()
+    max_id = max((char['id'] for char in data), default=0)
+    for char in data:
+        if char['id'] in seen:
+            max_id += 1
+            char['id'] = max_id
+        seen.add(char['id'])
+
+    tmp_filename = jsonl_filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8', newline='\n') as f:
+        for char in data:
+            f.write(json.dumps(char, ensure_ascii=False) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, jsonl_filename)
+
+    return len(data)
+
+
+# === СХОВИЩЕ JSON LINES З ІНДЕКСОМ ЗМІЩЕНЬ ===
+class JsonLinesDataStorage(IStorage):
+    """
+    Один персонаж - один рядок у characters.jsonl.
+    Поруч лежить індекс (characters.jsonl.idx): пари (id, зміщення рядка).
+    Під час відкриття читається лише індекс; записи декодуються при зверненні.
+    Зміни дописуються в кінець файлу, наявні рядки не перезаписуються:
+    оновлення - новий рядок, видалення - рядок-"надгробок".
+    """
+
+    def __init__(self, filename='characters.jsonl', legacy_filename='characters.json',
+                 cache_size=None):
+        super().__init__()
+        self.filename = filename
+        self.index_filename = f"{filename}.idx"
+        self.cache_size = cache_size or config.JSONL_CACHE_SIZE
+
+        if not os.path.exists(filename):
+            if legacy_filename and os.path.exists(legacy_filename):
+                migrate_json_to_jsonl(legacy_filename, filename)
+            else:
+                open(filename, 'a').close()
+
+        # id -> зміщення актуального рядка; порядок = порядок додавання
+        self._offsets = {}
+        self._max_id = 0
+        # Розкодовані записи (LRU)
+        self._cache = OrderedDict()
+        # Індекси імен і slug будуються лише при першому пошуку;
+        # _name_keys: id -> (ім'я, slug), під якими персонажа проіндексовано
+        self._by_name = None
+        self._by_slug = None
+        self._name_keys = {}
+
+        self.load()
+
+        self._data = open(filename, 'ab')
+        self._index = open(self.index_filename, 'ab')
+        self._reader = open(filename, 'rb')
+        self._unflushed = False
+
+    # --- індекс ---
+
+    def load(self):
+        """Читає індекс зміщень; якщо він відстає від даних - доіндексовує хвіст"""
+        self._offsets = {}
+        self._cache.clear()
+        self._by_name = None
+        self._by_slug = None
+        self._name_keys = {}
+
+        entries = array('q')
+        if os.path.exists(self.index_filename):
+            with open(self.index_filename, 'rb') as f:
+                raw = f.read()
+            # Неповний останній запис (збій під час дописування) відкидаємо
+            usable = len(raw) - len(raw) % (2 * entries.itemsize)
+            entries.frombytes(raw[:usable])
+            if usable != len(raw):
+                os.truncate(self.index_filename, usable)
+
+        last_offset = -1
+        for i in range(0, len(entries), 2):
+            char_id, offset = entries[i], entries[i + 1]
+            # Видалення зберігаються як -(зміщення + 1)
+            if offset < 0:
+                self._offsets.pop(char_id, None)
+                last_offset = max(last_offset, -offset - 1)
+            else:
+                self._offsets[char_id] = offset
+                last_offset = max(last_offset, offset)
+
+        self._max_id = max(self._offsets, default=0)
+        self._index_tail(last_offset)
+
+    def _index_tail(self, last_offset):
+        """Індексує рядки, що йдуть після last_offset (або весь файл, якщо індексу немає)"""
+        tail = array('q')
+        with open(self.filename, 'rb') as f:
+            if last_offset >= 0:
+                f.seek(last_offset)
+                f.readline()
+
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    # Обрізаний рядок після збою - відкидаємо
+                    if line:
+                        os.truncate(self.filename, offset)
+                    break
+
+                record = json.loads(line)
+                char_id = record['id']
+                if record.get('deleted'):
+                    self._offsets.pop(char_id, None)
+                    tail.extend((char_id, -offset - 1))
+                else:
+                    self._offsets[char_id] = offset
+                    self._max_id = max(self._max_id, char_id)
+                    tail.extend((char_id, offset))
+
+        if tail:
+            with open(self.index_filename, 'ab') as f:
+                tail.tofile(f)
+
+    # --- читання ---
+
+    def _read(self, char_id):
+        offset = self._offsets.get(char_id)
+        if offset is None:
+            return None
+
+        char = self._cache.get(char_id)
+        if char is not None:
+            self._cache.move_to_end(char_id)
+            return char
+
+        if self._unflushed:
+            self._data.flush()
+            self._unflushed = False
+
+        self._reader.seek(offset)
+        char = Character.from_dict(json.loads(self._reader.readline()))
+        self._remember(char)
+        return char
+
+    def _remember(self, char):
+        self._cache[char.id] = char
+        self._cache.move_to_end(char.id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def get_by_id(self, char_id):
+        return self._read(char_id)
+
+    def iter_all(self):
+        """Послідовний перегляд каталогу без створення повного списку"""
+        for char_id in list(self._offsets):
+            char = self._read(char_id)
+            if char is not None:
+                yield char
+
+    def get_all(self):
+        return list(self.iter_all())
+
+    def iter_page(self, sort='id', start=0, size=20, descending=False, after=None):
+        """За ID сторінка вибирається з індексу зміщень - читаються лише її записи"""
+        if sort != 'id':
+            yield from super().iter_page(sort, start, size, descending, after)
+            return
+
+        ids = self._offsets.keys()
+        if after is not None:
+            if after not in self._offsets:
+                return
+            ids = (char_id for char_id in ids if (char_id < after if descending else char_id > after))
+            start = 0
+
+        select = heapq.nlargest if descending else heapq.nsmallest
+        for char_id in select(start + size, ids)[start:]:
+            yield self._read(char_id)
+
+    def count(self):
+        return len(self._offsets)
+
+    def max_id(self):
+        return self._max_id
+
+    def _build_lookups(self):
+        """Індекси імен і slug - за один перегляд каталогу"""
+        if self._by_name is None:
+            self._by_name = {}
+            self._by_slug = {}
+            for char in self.iter_all():
+                self._remember_name(char)
+
+    def _name_index(self):
+        self._build_lookups()
+        return self._by_name
+
+    def _slug_index(self):
+        self._build_lookups()
+        return self._by_slug
+
+    def find_by_name(self, name):
+        ids = self._name_index().get(normalize_name(name), ())
+        return [self._read(char_id) for char_id in ids]
+
+    def exists_by_name(self, name):
+        return normalize_name(name) in self._name_index()
+
+    def find_by_slug(self, slug):
+        char_id = self._slug_index().get(slug)
+        return None if char_id is None else self._read(char_id)
+
+    def exists_by_slug(self, slug):
+        return slug in self._slug_index()
+
+    # --- запис ---
+
+    def _append(self, record, char_id, deleted=False):
+        offset = self._data.tell()
+        self._data.write((json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+        self._index.write(array('q', (char_id, -offset - 1 if deleted else offset)).tobytes())
+        self._unflushed = True
+        return offset
+
+    def _forget_name(self, char_id):
+        # Не з кешованого об'єкта: його могли змінити на місці перед update_character
+        keys = self._name_keys.pop(char_id, None)
+        if self._by_name is None or keys is None:
+            return
+        name, slug = keys
+        ids = self._by_name.get(name)
+        if ids is not None:
+            ids.pop(char_id, None)
+            if not ids:
+                del self._by_name[name]
+        if slug and self._by_slug.get(slug) == char_id:
+            del self._by_slug[slug]
+
+    def _remember_name(self, char):
+        if self._by_name is not None:
+            name = normalize_name(char.name)
+            self._name_keys[char.id] = (name, char.slug)
+            self._by_name.setdefault(name, {})[char.id] = None
+            if char.slug:
+                self._by_slug[char.slug] = char.id
+
+    def add_character(self, character):
+        if character.id in self._offsets:
+            raise ValueError(f"Персонаж з ID {character.id} вже існує")
+
+        self._offsets[character.id] = self._append(character.to_dict(), character.id)
+        self._max_id = max(self._max_id, character.id)
+        self._remember(character)
+        self._remember_name(character)
+        self._changed('add', character)
+
+    def update_character(self, character):
+        if character.id not in self._offsets:
+            return False
+
+        self._forget_name(character.id)
+        self._offsets[character.id] = self._append(character.to_dict(), character.id)
+        self._remember(character)
+        self._remember_name(character)
+        self._changed('update', character)
+        return True
+
+    def delete_by_id(self, char_id):
+        if char_id not in self._offsets:
+            return False
+
+        self._forget_name(char_id)
+        self._append({'id': char_id, 'deleted': True}, char_id, deleted=True)
+        del self._offsets[char_id]
+        self._cache.pop(char_id, None)
+        self._changed('delete', char_id)
+        return True
+
+    def flush(self):
+        """Дописані рядки та індекс - на диск (один fsync на пакет)"""
+        if not self._dirty:
+            return
+
+        for f in (self._data, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+        self._unflushed = False
+        self._dirty = False
+
+    def save(self):
+        """Повний перезапис без застарілих рядків і надгробків"""
+        self.flush()
+
+        tmp_filename = self.filename + '.tmp'
+        entries = array('q')
+        with open(tmp_filename, 'wb') as f:
+            for char in self.iter_all():
+                entries.extend((char.id, f.tell()))
+                f.write((json.dumps(char.to_dict(), ensure_ascii=False) + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+        for handle in (self._data, self._index, self._reader):
+            handle.close()
+
+        # Без індексу load() перебудує його з даних, тож збій між кроками не страшний
+        os.remove(self.index_filename)
+        os.replace(tmp_filename, self.filename)
+
+        tmp_index = self.index_filename + '.tmp'
+        with open(tmp_index, 'wb') as f:
+            entries.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_index, self.index_filename)
+
+        self._data = open(self.filename, 'ab')
+        self._index = open(self.index_filename, 'ab')
+        self._reader = open(self.filename, 'rb')
+        self.load()
+
+    def close(self):
+        self.flush()
+        for handle in (self._data, self._index, self._reader):
+            handle.close()
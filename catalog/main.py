@@ -1,63 +1,34 @@
 #main.py
-import json
-import os
+import re
+import sys
+import time
+
+import config
 from api_client import GenshinAPIClient, GenshinCharacterParser
+from bundle import BundleImageSource, BundleReader, export_bundle
 from image_manager import ImageManager
+from importer import ImportEngine
+from jsonl_storage import JsonLinesDataStorage
+from metrics import hit_ratio, metrics, summary_lines
+from sqlite_storage import SQLiteDataStorage
+from storage import SORT_KEYS, Character, CharacterFilter, DataStorage, JournalDataStorage
+
 
+# === ВИБІР СХОВИЩА ===
+STORAGE_BACKENDS = {
+    'json': DataStorage,
+    'journal': JournalDataStorage,
+    'sqlite': SQLiteDataStorage,
+    'jsonl': JsonLinesDataStorage,
+}
 
-# === МОДЕЛЬ ДАНИХ ===
-class Character:
-    def __init__(self, id, name, char_type, health, attack, image_url="", local_image_path=""):
-        self.id = id
-        self.name = name
-        self.type = char_type
-        self.health = health
-        self.attack = attack
-        self.image_url = image_url
-        self.local_image_path = local_image_path
-
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'type': self.type,
-            'health': self.health,
-            'attack': self.attack,
-            'image_url': self.image_url,
-            'local_image_path': self.local_image_path
-        }
-
-
-# === ЗБЕРЕЖЕННЯ ДАНИХ ===
-class DataStorage:
-    def __init__(self, filename='characters.json'):
-        self.filename = filename
-        self.characters = self.load()
-
-    def load(self):
-        if os.path.exists(self.filename):
-            with open(self.filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return [Character(**char) for char in data]
-        return []
-
-    def save(self):
-        with open(self.filename, 'w', encoding='utf-8') as f:
-            json.dump([char.to_dict() for char in self.characters], f,
-                      ensure_ascii=False, indent=2)
-
-    def add_character(self, character):
-        self.characters.append(character)
-        self.save()
-
-    def get_all(self):
-        return self.characters
-
-    def get_by_id(self, char_id):
-        for char in self.characters:
-            if char.id == char_id:
-                return char
-        return None
+
+def create_storage(backend=None):
+    """Створює сховище за назвою (за замовчуванням - з config.STORAGE_BACKEND)"""
+    backend = backend or config.STORAGE_BACKEND
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Невідомий тип сховища: {backend}")
+    return STORAGE_BACKENDS[backend]()
 
 
 # === ARG PARSER ===
@@ -75,16 +46,91 @@ class IRenderer:
     def render(self, data):
         raise NotImplementedError
 
+    def render_many(self, characters):
+        """Виводить персонажів по одному; повертає їх кількість"""
+        count = 0
+        for character in characters:
+            self.render(self.transform(character))
+            count += 1
+        return count
+
+    def status(self, ok):
+        """Позначка успіху / помилки для рядків прогресу"""
+        return "✓" if ok else "❌"
+
+
+# Емодзі (для виводу не в термінал): лише блоки піктограм та окремі емодзі-символи,
+# щоб №, ™, ℃ чи стрілки в даних персонажів залишались
+EMOJI_PATTERN = re.compile('[\u2139\u231a\u231b\u23e9-\u23fa\u2600-\u27bf\u2b05-\u2b07\u2b1b\u2b1c'
+                           '\u2b50\u2b55\ufe0f\u200d\U0001f000-\U0001faff] ?')
+
+
+def strip_emoji(text):
+    return EMOJI_PATTERN.sub('', text)
+
 
 class ConsoleRenderer(IRenderer):
+    # Скільки рядків збирається в один запис у render_many
+    CHUNK_LINES = 4096
+
+    def __init__(self, stream=None, plain=None):
+        """
+        stream: куди писати (за замовчуванням - поточний sys.stdout)
+        plain: текст без емодзі; за замовчуванням - коли вивід не в термінал (конвеєр, файл)
+        """
+        self._stream = stream
+        self._plain = plain
+
+    @property
+    def stream(self):
+        return self._stream or sys.stdout
+
+    @property
+    def plain(self):
+        if self._plain is not None:
+            return self._plain
+        isatty = getattr(self.stream, 'isatty', None)
+        return not (isatty and isatty())
+
     def render(self, data):
-        print(data)
+        if self.plain:
+            data = strip_emoji(str(data))
+        print(data, file=self.stream)
 
     def transform(self, character):
-        # Індикатор наявності локального зображення
-        img_indicator = "🖼️" if character.local_image_path else "🌐"
+        # Індикатор наявності локального зображення (не в термінал: + - локально, - - лише онлайн)
+        if self.plain:
+            img_indicator = "+" if character.local_image_path else "-"
+        else:
+            img_indicator = "🖼️" if character.local_image_path else "🌐"
         return f"{img_indicator} {character.id}. {character.name} ({character.type}) - HP: {character.health}, ATK: {character.attack}"
 
+    def status(self, ok):
+        # Не в термінал емодзі вирізаються - тоді позначка текстова
+        if self.plain:
+            return "ok" if ok else "FAIL"
+        return super().status(ok)
+
+    def render_many(self, characters):
+        """
+        Рядки форматуються пачками й пишуться блоками по CHUNK_LINES -
+        один виклик write замість print на кожного персонажа
+        """
+        transform = self.transform
+        write = self.stream.write
+        chunk = []
+        count = 0
+        for character in characters:
+            chunk.append(transform(character))
+            if len(chunk) >= self.CHUNK_LINES:
+                write('\n'.join(chunk) + '\n')
+                count += len(chunk)
+                chunk.clear()
+        if chunk:
+            write('\n'.join(chunk) + '\n')
+            count += len(chunk)
+        return count
+
 
 # === КОМАНДИ (STRATEGY) ===
 class ICommandStrategy:
@@ -96,22 +142,82 @@ class ICommandStrategy:
 
 
 class ListCommand(ICommandStrategy):
+    def __init__(self, img_manager):
+        # Один ImageManager на весь CLI: маніфест і папка кешу читаються один раз
+        self.img_manager = img_manager
+
     def get_command_selectors(self):
         return ['list', 'ls']
 
+    PAGE_SIZE = 50
+
+    @classmethod
+    def parse_options(cls, args):
+        """
+        list [sort=id|name|health|attack] [desc] [page=N] [size=N|all] [after=<id>]
+        sort=-health - те саме, що sort=health desc
+        """
+        options = {'sort': 'id', 'descending': False, 'page': 1, 'size': cls.PAGE_SIZE, 'after': None}
+        for arg in args:
+            key, _, value = arg.partition('=')
+            key = key.lower()
+            if key == 'desc':
+                options['descending'] = True
+            elif key == 'sort':
+                if value.startswith('-'):
+                    options['descending'] = True
+                    value = value[1:]
+                if value not in SORT_KEYS:
+                    raise ValueError(f"Сортування можливе за: {', '.join(SORT_KEYS)}")
+                options['sort'] = value
+            elif key in ('page', 'size', 'after'):
+                if key == 'size' and value == 'all':
+                    options['size'] = None
+                    continue
+                try:
+                    options[key] = int(value)
+                except ValueError:
+                    raise ValueError(f"{key} має бути числом: {value}")
+                if key in ('page', 'size') and options[key] < 1:
+                    raise ValueError(f"{key} має бути більше 0")
+            else:
+                raise ValueError(f"Невідомий параметр: {arg}")
+        return options
+
     def exec_command(self, command, args, storage, renderer):
-        chars = storage.get_all()
-        if not chars:
+        try:
+            options = self.parse_options(args)
+        except ValueError as e:
+            renderer.render(f"❌ {e}")
+            return
+
+        total = storage.count()
+        if not total:
             renderer.render("Список персонажів порожній")
+            return
+
+        size = options['size'] or total
+        start = (options['page'] - 1) * size
+        # Зі сховища береться і форматується лише запитана сторінка
+        page = list(storage.iter_page(options['sort'], start, size,
+                                      options['descending'], options['after']))
+        last = page[-1] if page else None
+
+        renderer.render("=== Список персонажів ===")
+        shown = renderer.render_many(page)
+
+        if options['after'] is None:
+            pages = -(-total // size)
+            renderer.render(f"\nСторінка {options['page']} з {pages} (всього {total})")
         else:
-            renderer.render("=== Список персонажів ===")
-            for char in chars:
-                renderer.render(renderer.transform(char))
+            renderer.render(f"\nПоказано {shown} (всього {total})")
+        if last is not None and options['size'] and shown == size:
+            order = f" sort={options['sort']}" + (" desc" if options['descending'] else "")
+            renderer.render(f"Далі: list after={last.id}{order} size={size}")
 
-            # Показуємо статистику кешу
-            img_manager = ImageManager()
-            cached_count = img_manager.get_cached_image_count()
-            renderer.render(f"\n📊 Збережено зображень локально: {cached_count}")
+        # Показуємо статистику кешу
+        cached_count = self.img_manager.get_cached_image_count()
+        renderer.render(f"\n📊 Збережено зображень локально: {cached_count}")
 
 
 class AddCommand(ICommandStrategy):
@@ -126,13 +232,16 @@ class AddCommand(ICommandStrategy):
         attack = int(input("Атака: "))
         image_url = input("URL зображення (необов'язково): ")
 
-        char_id = len(storage.get_all()) + 1
+        char_id = storage.max_id() + 1
         new_char = Character(char_id, name, char_type, health, attack, image_url)
         storage.add_character(new_char)
         renderer.render(f"✓ Персонаж '{name}' створено!")
 
 
 class ShowCommand(ICommandStrategy):
+    def __init__(self, img_manager):
+        self.img_manager = img_manager
+
     def get_command_selectors(self):
         return ['show', 'view']
 
@@ -152,8 +261,13 @@ class ShowCommand(ICommandStrategy):
             renderer.render(f"Атака: {char.attack}")
             if char.image_url:
                 renderer.render(f"URL зображення: {char.image_url}")
-            if char.local_image_path:
-                renderer.render(f"✓ Локальне зображення: {char.local_image_path}")
+            # Перегляд - це звернення до зображення; витіснене з кешу завантажується знову
+            local_path = self.img_manager.ensure_image(char) if char.local_image_path else None
+            if local_path and local_path != char.local_image_path:
+                char.local_image_path = local_path
+                storage.update_character(char)
+            if local_path:
+                renderer.render(f"✓ Локальне зображення: {local_path}")
             else:
                 renderer.render(f"✗ Локальне зображення відсутнє")
         else:
@@ -167,36 +281,125 @@ class HelpCommand(ICommandStrategy):
     def exec_command(self, command, args, storage, renderer):
         help_text = """
 === Доступні команди ===
-list, ls       - Показати всіх персонажів
+list, ls       - Показати персонажів: [sort=id|name|health|attack] [desc] [page=N] [size=N|all] [after=<id>]
 add, create    - Додати нового персонажа
 show <id>      - Показати деталі персонажа
+search, filter - Пошук: [частина імені] vision=pyro weapon=bow health=80..100 attack=50..
 import, fetch  - Імпортувати персонажів з API (+ завантаження зображень)
+import sync    - Імпортувати лише нових персонажів (+ refresh: оновити змінені)
+import bundle <файл> [sync] - Імпортувати зі знімка (без мережі)
+bundle export <файл> [N] - Зберегти дані API та зображення у знімок (zip)
+bundle info <файл> - Показати вміст знімка
 cache          - Показати статистику кешу зображень
+cache evict [МБ] - Видалити давно використані зображення понад ліміт
 clear-cache    - Очистити кеш зображень
+stats          - Метрики сеансу: запити API, кеш, затримки (stats export [файл] - у JSON)
 help, ?        - Показати цю довідку
 exit, quit     - Вийти з програми
 
 Легенда:
-🖼️ - зображення збережено локально
-🌐 - зображення доступне тільки онлайн
+🖼️ - зображення збережено локально (+ при виводі не в термінал)
+🌐 - зображення доступне тільки онлайн (-)
         """
         renderer.render(help_text)
 
 
+# === ПОШУК І ФІЛЬТРАЦІЯ ===
+# Умови key=value: текстові поля та діапазони (health=80..100, attack=50.., health=..90)
+TEXT_FILTERS = {'type': 'char_type', 'vision': 'vision', 'weapon': 'weapon', 'name': 'name'}
+RANGE_FILTERS = ('health', 'attack')
+
+
+def parse_range(value):
+    """'80..100' -> (80, 100), '80..' -> (80, None), '..100' -> (None, 100), '90' -> (90, 90)"""
+    if '..' not in value:
+        return int(value), int(value)
+    low, high = value.split('..', 1)
+    return (int(low) if low else None), (int(high) if high else None)
+
+
+def parse_filter(args):
+    """
+    Аргументи команди -> CharacterFilter.
+    Слова без '=' - частина імені: search hu tao vision=pyro
+    """
+    kwargs = {}
+    words = []
+    for arg in args:
+        key, sep, value = arg.partition('=')
+        if not sep:
+            words.append(arg)
+            continue
+
+        key = key.lower()
+        if key in TEXT_FILTERS:
+            kwargs[TEXT_FILTERS[key]] = value
+        elif key in RANGE_FILTERS:
+            try:
+                kwargs[f'min_{key}'], kwargs[f'max_{key}'] = parse_range(value)
+            except ValueError:
+                raise ValueError(f"Неправильний діапазон {key}: {value}")
+        else:
+            raise ValueError(f"Невідома умова: {key}")
+
+    if words:
+        kwargs['name'] = ' '.join(words)
+    return CharacterFilter(**kwargs)
+
+
+class SearchCommand(ICommandStrategy):
+    def get_command_selectors(self):
+        return ['search', 'find', 'filter']
+
+    def exec_command(self, command, args, storage, renderer):
+        if not args:
+            renderer.render("Використання: search [частина імені] [type=... vision=... weapon=... "
+                            "health=min..max attack=min..max]")
+            return
+
+        try:
+            character_filter = parse_filter(args)
+        except ValueError as e:
+            renderer.render(f"❌ {e}")
+            return
+
+        start = time.perf_counter()
+        found = storage.query(character_filter)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if not found:
+            renderer.render("Нічого не знайдено")
+            return
+
+        renderer.render(f"=== Знайдено: {len(found)} ({elapsed_ms:.2f} мс) ===")
+        renderer.render_many(found)
+
+
 # === ІМПОРТ ПЕРСОНАЖІВ З API ===
 class ImportCommand(ICommandStrategy):
 
+    def __init__(self, img_manager):
+        self.img_manager = img_manager
+
     def get_command_selectors(self):
         return ['import', 'fetch']
 
     def exec_command(self, command, args, storage, renderer):
+        # import bundle <файл> [sync] - зі знімка, без мережі
+        if args and args[0] == 'bundle':
+            if len(args) < 2:
+                renderer.render("Використання: import bundle <файл> [sync]")
+                return
+            self.import_bundle(args[1], 'sync' in args[2:], storage, renderer)
+            return
+
         renderer.render("=== Імпорт персонажів з API ===")
         renderer.render("Завантаження списку персонажів...")
 
-        # Створюємо клієнт API та менеджер зображень
+        # Створюємо клієнт API (менеджер зображень - спільний для CLI)
         api_client = GenshinAPIClient()
         parser = GenshinCharacterParser()
-        img_manager = ImageManager()
+        img_manager = self.img_manager
 
         # Отримуємо список імен
         character_names = api_client.get_all_character_names()
@@ -207,83 +410,202 @@ class ImportCommand(ICommandStrategy):
 
         renderer.render(f"Знайдено {len(character_names)} персонажів")
 
+        # import sync [refresh] - дельта-імпорт лише відсутніх (і змінених) персонажів
+        sync = 'sync' in args
+        refresh = 'refresh' in args
+
+        if sync:
+            count = len(character_names)
+            renderer.render("Синхронізація: завантажуються лише нові персонажі...")
+        else:
+            try:
+                count = int(input(f"Скільки завантажити? (1-{len(character_names)}): "))
+                count = min(count, len(character_names))
+            except:
+                count = 5
+
+            renderer.render(f"Завантаження {count} персонажів...")
+
+        engine = ImportEngine(api_client, parser, img_manager, Character)
+
+        result = engine.run(character_names[:count], storage, on_progress=self.reporter(renderer),
+                            sync=sync, refresh=refresh)
+        img_manager.flush()
+        self.render_result(result, sync, renderer)
+
+    def import_bundle(self, filename, sync, storage, renderer):
+        """Персонажі та зображення з архіву знімка (bundle export) замість API"""
+        renderer.render(f"=== Імпорт зі знімка {filename} ===")
         try:
-            count = int(input(f"Скільки завантажити? (1-{len(character_names)}): "))
-            count = min(count, len(character_names))
-        except:
-            count = 5
+            reader = BundleReader(filename)
+        except (OSError, ValueError) as e:
+            renderer.render(f"❌ Не вдалося відкрити знімок: {e}")
+            return
+
+        img_manager = self.img_manager
+        with reader:
+            names = reader.get_all_character_names()
+            renderer.render(f"Знайдено {len(names)} персонажів")
+
+            engine = ImportEngine(reader, GenshinCharacterParser(),
+                                  BundleImageSource(reader, img_manager), Character)
+            result = engine.run(names, storage, on_progress=self.reporter(renderer), sync=sync)
+        img_manager.flush()
+        self.render_result(result, sync, renderer)
+
+    @staticmethod
+    def reporter(renderer):
+        def report(item):
+            if item.unchanged:
+                status = "без змін"
+            else:
+                status = renderer.status(item.character is not None)
+            renderer.render(f"[{item.index}/{item.total}] {item.name} {status}")
+        return report
+
+    @staticmethod
+    def render_result(result, sync, renderer):
+        renderer.render(f"\n✓ Успішно імпортовано {result.imported} персонажів!")
+        if sync:
+            renderer.render(f"✓ Оновлено {result.updated}, без змін {result.skipped}")
+        renderer.render(f"✓ Завантажено {result.images_downloaded} нових зображень")
+
+
+# === ЗНІМОК API ДЛЯ РОБОТИ БЕЗ МЕРЕЖІ ===
+class BundleCommand(ICommandStrategy):
 
-        renderer.render(f"Завантаження {count} персонажів...")
+    def __init__(self, img_manager):
+        self.img_manager = img_manager
 
-        imported = 0
-        images_downloaded = 0
-        current_max_id = max([c.id for c in storage.get_all()], default=0)
+    def get_command_selectors(self):
+        return ['bundle']
 
-        # Завантажуємо по одному
-        for i, name in enumerate(character_names[:count]):
-            renderer.render(f"\n[{i + 1}/{count}] Завантаження {name}...")
+    def exec_command(self, command, args, storage, renderer):
+        # bundle export <файл> [кількість] / bundle info <файл>
+        if len(args) < 2 or args[0] not in ('export', 'info'):
+            renderer.render("Використання: bundle export <файл> [кількість] | bundle info <файл>")
+            return
 
-            details = api_client.get_character_details(name)
-            if details:
-                char = parser.parse_to_character(details, current_max_id + i + 1, Character)
+        if args[0] == 'info':
+            try:
+                with BundleReader(args[1]) as reader:
+                    index = reader.index
+            except (OSError, ValueError) as e:
+                renderer.render(f"❌ Не вдалося відкрити знімок: {e}")
+                return
+            with_images = sum(1 for entry in index['characters'] if entry.get('image'))
+            renderer.render(f"Джерело: {index['source']}")
+            renderer.render(f"Створено: {time.strftime('%Y-%m-%d %H:%M', time.localtime(index['created']))}")
+            renderer.render(f"Персонажів: {len(index['characters'])}, із зображенням: {with_images}")
+            return
 
-                # Завантаження зображень
-                local_path = img_manager.download_image(char.image_url, char.name)
-                if local_path:
-                    char.local_image_path = local_path
-                    images_downloaded += 1
+        renderer.render("=== Експорт знімка API ===")
+        api_client = GenshinAPIClient()
+        names = api_client.get_all_character_names()
+        if not names:
+            renderer.render("❌ Не вдалося завантажити персонажів")
+            return
+        if len(args) > 2 and args[2].isdigit():
+            names = names[:int(args[2])]
 
-                storage.add_character(char)
-                imported += 1
+        def report(index, total, name, ok):
+            renderer.render(f"[{index}/{total}] {name} {renderer.status(ok)}")
 
-        renderer.render(f"\n✓ Успішно імпортовано {imported} персонажів!")
-        renderer.render(f"✓ Завантажено {images_downloaded} нових зображень")
+        characters, images = export_bundle(args[1], api_client, self.img_manager, names,
+                                           on_progress=report)
+        renderer.render(f"\n✓ Знімок збережено: {args[1]} ({characters} персонажів, {images} зображень)")
 
 
 # === СТАТИСТИКА КЕШУ ===
+MB = 1024 * 1024
+
+
 class CacheStatsCommand(ICommandStrategy):
+    def __init__(self, img_manager):
+        self.img_manager = img_manager
+
     def get_command_selectors(self):
         return ['cache', 'cache-stats']
 
     def exec_command(self, command, args, storage, renderer):
-        img_manager = ImageManager()
+        img_manager = self.img_manager
+
+        # cache evict [МБ] - видалити давно використані зображення понад ліміт
+        if args and args[0] == 'evict':
+            max_bytes = int(float(args[1]) * MB) if len(args) > 1 else None
+            removed, freed = img_manager.evict(max_bytes)
+            renderer.render(f"✓ Видалено зображень: {removed}, звільнено {freed / MB:.1f} МБ")
+            return
+
         cached_count = img_manager.get_cached_image_count()
-        total_chars = len(storage.get_all())
+        total_chars = storage.count()
 
         renderer.render(f"\n=== Статистика кешу зображень ===")
         renderer.render(f"Всього персонажів: {total_chars}")
         renderer.render(f"Збережено зображень: {cached_count}")
+        renderer.render(f"Займають: {img_manager.get_cached_bytes() / MB:.1f} МБ "
+                        f"з {img_manager.max_bytes / MB:.1f} МБ")
+
+        hits, misses = metrics.value('images.cache_hits'), metrics.value('images.cache_misses')
+        if hits or misses:
+            renderer.render(f"За цей сеанс: влучань {hits}, промахів {misses} "
+                            f"({hit_ratio(hits, misses)}%)")
         renderer.render(f"Папка кешу: {img_manager.cache_dir}/")
 
 
 # === ОЧИСТКА КЕШУ ===
 class ClearCacheCommand(ICommandStrategy):
+    def __init__(self, img_manager):
+        self.img_manager = img_manager
+
     def get_command_selectors(self):
         return ['clear-cache', 'clean']
 
     def exec_command(self, command, args, storage, renderer):
         confirm = input("Ви впевнені? Це видалить всі збережені зображення (y/n): ")
         if confirm.lower() == 'y':
-            img_manager = ImageManager()
+            img_manager = self.img_manager
             img_manager.clear_cache()
             renderer.render("✓ Кеш очищено")
         else:
             renderer.render("Операція скасована")
 
 
+# === МЕТРИКИ ===
+class StatsCommand(ICommandStrategy):
+    def get_command_selectors(self):
+        return ['stats', 'metrics']
+
+    def exec_command(self, command, args, storage, renderer):
+        # stats export [файл] - знімок усіх метрик у JSON
+        if args and args[0] == 'export':
+            filename = args[1] if len(args) > 1 else 'metrics.json'
+            metrics.export_json(filename)
+            renderer.render(f"✓ Метрики збережено: {filename}")
+            return
+
+        renderer.render("\n=== Метрики сеансу ===")
+        for line in summary_lines():
+            renderer.render(line)
+
+
 # === ГОЛОВНИЙ CLI ===
 class CLI:
     def __init__(self):
-        self.storage = DataStorage()
+        self.storage = create_storage()
         self.renderer = ConsoleRenderer()
+        self.img_manager = ImageManager()
         self.commands = [
-            ListCommand(),
+            ListCommand(self.img_manager),
             AddCommand(),
-            ShowCommand(),
+            ShowCommand(self.img_manager),
+            SearchCommand(),
             HelpCommand(),
-            ImportCommand(),
-            CacheStatsCommand(),
-            ClearCacheCommand()
+            ImportCommand(self.img_manager),
+            BundleCommand(self.img_manager),
+            CacheStatsCommand(self.img_manager),
+            ClearCacheCommand(self.img_manager),
+            StatsCommand()
         ]
         self.parser = ArgParser()
 
@@ -322,6 +644,9 @@ class CLI:
             except Exception as e:
                 print(f"Помилка: {e}")
 
+        self.storage.close()
+        self.img_manager.flush()
+
 
 # === ЗАПУСК ===
 if __name__ == "__main__":
@@ -0,0 +1,176 @@
+#metrics.py
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Межі кошиків гістограми затримок (мс); останній кошик - усе, що більше
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+# === ЛІЧИЛЬНИК ===
+class Counter:
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def to_dict(self):
+        return self.value
+
+
+# === ГІСТОГРАМА ЗАТРИМОК ===
+class Histogram:
+    """Кількість спостережень у кожному кошику + сума, мінімум і максимум"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value_ms):
+        self.counts[bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.min = value_ms if self.min is None else min(self.min, value_ms)
+        self.max = value_ms if self.max is None else max(self.max, value_ms)
+
+    def percentile(self, p):
+        """Верхня межа кошика, в який потрапляє p-й перцентиль"""
+        if not self.count:
+            return None
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total / self.count, 3) if self.count else None,
+            'min_ms': self.min,
+            'max_ms': self.max,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'buckets_ms': dict(zip([str(b) for b in self.buckets] + ['inf'], self.counts))
+        }
+
+
+# === РЕЄСТР МЕТРИК ===
+class MetricsRegistry:
+    """
+    Метрики процесу за назвою: 'api.requests', 'images.cache_hits', ...
+    Оновлення приходять з робочих потоків імпорту, тому йдуть під блокуванням.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, amount=1):
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                counter = self._counters[name] = Counter()
+            counter.inc(amount)
+
+    def observe(self, name, value_ms):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(value_ms)
+
+    @contextmanager
+    def timer(self, name):
+        """
+        Тривалість блоку в гістограму name (мс):
+            with metrics.timer('storage.save_ms'):
+                ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start) * 1000)
+
+    def value(self, name):
+        counter = self._counters.get(name)
+        return counter.value if counter else 0
+
+    def histogram(self, name):
+        return self._histograms.get(name)
+
+    def snapshot(self):
+        """Поточні значення всіх метрик (словник, придатний для JSON)"""
+        with self._lock:
+            return {
+                'timestamp': time.time(),
+                'counters': {name: c.to_dict() for name, c in sorted(self._counters.items())},
+                'histograms': {name: h.to_dict() for name, h in sorted(self._histograms.items())}
+            }
+
+    def export_json(self, filename):
+        """Знімок метрик у JSON-файл (storage імпортує metrics, тому без write_json_atomic)"""
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_filename, filename)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+# Спільний реєстр процесу
+metrics = MetricsRegistry()
+
+
+def hit_ratio(hits, misses):
+    """Частка влучань у кеш у відсотках (None, якщо звернень не було)"""
+    total = hits + misses
+    return round(hits * 100 / total, 1) if total else None
+
+
+def summary_lines():
+    """Короткий звіт для CLI та вікна статистики"""
+    lines = []
+
+    api_hits = metrics.value('api.cache_hits')
+    api_requests = metrics.value('api.requests')
+    lines.append(f"Запити до API: {api_requests}, з кешу без запиту: {api_hits}, "
+                 f"304: {metrics.value('api.not_modified')}")
+    statuses = {name.rsplit('.', 1)[1]: metrics.value(name)
+                for name in metrics.snapshot()['counters'] if name.startswith('api.status.')}
+    if statuses:
+        lines.append("Статуси API: " + ", ".join(f"{code}: {n}" for code, n in statuses.items()))
+
+    hits = metrics.value('images.cache_hits')
+    misses = metrics.value('images.cache_misses')
+    ratio = hit_ratio(hits, misses)
+    lines.append(f"Кеш зображень: влучань {hits}, промахів {misses}"
+                 + (f" ({ratio}%)" if ratio is not None else ""))
+    lines.append(f"Завантажено: {metrics.value('images.bytes_downloaded') / (1024 * 1024):.2f} МБ")
+
+    for name, title in (('api.request_ms', 'Запит API'),
+                        ('images.download_ms', 'Завантаження зображення'),
+                        ('storage.save_ms', 'Запис сховища')):
+        histogram = metrics.histogram(name)
+        if histogram and histogram.count:
+            data = histogram.to_dict()
+            lines.append(f"{title}: {data['count']} разів, середнє {data['avg_ms']:.1f} мс, "
+                         f"p95 ≤ {data['p95_ms']:.1f} мс")
+
+    return lines
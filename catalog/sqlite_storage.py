@@ -0,0 +1,238 @@
+#sqlite_storage.py
+import json
+import os
+import sqlite3
+
+from storage import Character, IStorage
+
+COLUMNS = 'id, name, type, health, attack, image_url, local_image_path, slug'
+
+# Стовпці для сортування списку (за кожним є індекс)
+SORT_COLUMNS = {'id': 'id', 'name': 'name COLLATE NOCASE', 'health': 'health', 'attack': 'attack'}
+
+
+# === СХОВИЩЕ НА SQLITE ===
+class SQLiteDataStorage(IStorage):
+    """
+    Персонажі зберігаються в SQLite (режим WAL) з індексами на id, name і type.
+    Каталог не завантажується в пам'ять повністю - кожен запит іде в базу.
+    """
+
+    def __init__(self, filename='characters.db', legacy_filename='characters.json'):
+        super().__init__()
+        self.filename = filename
+        is_new = not os.path.exists(filename)
+
+        self.conn = sqlite3.connect(filename)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+
+        # Перший запуск: переносимо дані з JSON-каталогу
+        if is_new and legacy_filename and os.path.exists(legacy_filename):
+            try:
+                self._import_legacy(legacy_filename)
+            except BaseException:
+                # Без бази наступний запуск повторить перенесення, а не почне з порожньої
+                self.conn.close()
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(filename + suffix):
+                        os.remove(filename + suffix)
+                raise
+
+    def _create_schema(self):
+        # id - INTEGER PRIMARY KEY, тобто вже індексований rowid
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS characters (
+                id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                type TEXT NOT NULL DEFAULT '',
+                health INTEGER NOT NULL DEFAULT 0,
+                attack INTEGER NOT NULL DEFAULT 0,
+                image_url TEXT NOT NULL DEFAULT '',
+                local_image_path TEXT NOT NULL DEFAULT '',
+                slug TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS idx_characters_name ON characters(name COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_characters_type ON characters(type);
+            CREATE INDEX IF NOT EXISTS idx_characters_health ON characters(health);
+            CREATE INDEX IF NOT EXISTS idx_characters_attack ON characters(attack);
+        ''')
+        # Бази попередніх версій - без стовпця slug
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(characters)')}
+        if 'slug' not in columns:
+            self.conn.execute("ALTER TABLE characters ADD COLUMN slug TEXT NOT NULL DEFAULT ''")
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_characters_slug ON characters(slug)')
+        self.conn.commit()
+
+    def _import_legacy(self, legacy_filename):
+        """Перенесення однією транзакцією; дублікати ID отримують нові ID, як у DataStorage"""
+        with open(legacy_filename, 'r', encoding='utf-8') as f:
+            characters = [Character.from_dict(char) for char in json.load(f)]
+
+        seen = set()
+        max_id = max((char.id for char in characters), default=0)
+        for char in characters:
+            if char.id in seen:
+                max_id += 1
+                char.id = max_id
+            seen.add(char.id)
+
+        try:
+            self.conn.executemany(f'INSERT INTO characters ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                  map(self._to_row, characters))
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    @staticmethod
+    def _to_row(character):
+        return (character.id, character.name, character.type, character.health,
+                character.attack, character.image_url or '', character.local_image_path or '',
+                character.slug or '')
+
+    @staticmethod
+    def _to_character(row):
+        return Character(*row)
+
+    def _query(self, sql, params=()):
+        return [self._to_character(row) for row in self.conn.execute(sql, params)]
+
+    def load(self):
+        return self.get_all()
+
+    def save(self):
+        """Фіксація транзакції (усі зміни пакета - одним записом)"""
+        self.conn.commit()
+        self._dirty = False
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def add_character(self, character):
+        self.conn.execute(f'INSERT INTO characters ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                          self._to_row(character))
+        self._changed('add', character)
+
+    def update_character(self, character):
+        row = self._to_row(character)
+        cursor = self.conn.execute(
+            'UPDATE characters SET name = ?, type = ?, health = ?, attack = ?, '
+            'image_url = ?, local_image_path = ?, slug = ? WHERE id = ?',
+            row[1:] + row[:1])
+        if not cursor.rowcount:
+            return False
+        self._changed('update', character)
+        return True
+
+    def delete_by_id(self, char_id):
+        cursor = self.conn.execute('DELETE FROM characters WHERE id = ?', (char_id,))
+        if not cursor.rowcount:
+            return False
+        self._changed('delete', char_id)
+        return True
+
+    def get_all(self):
+        return self._query(f'SELECT {COLUMNS} FROM characters ORDER BY id')
+
+    def iter_all(self):
+        """Потоковий перебір без створення повного списку"""
+        cursor = self.conn.execute(f'SELECT {COLUMNS} FROM characters ORDER BY id')
+        for row in cursor:
+            yield self._to_character(row)
+
+    def get_by_id(self, char_id):
+        row = self.conn.execute(f'SELECT {COLUMNS} FROM characters WHERE id = ?',
+                                (char_id,)).fetchone()
+        return self._to_character(row) if row else None
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM characters').fetchone()[0]
+
+    def max_id(self):
+        return self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM characters').fetchone()[0]
+
+    def find_by_name(self, name):
+        return self._query(
+            f'SELECT {COLUMNS} FROM characters WHERE name = ? COLLATE NOCASE ORDER BY id', (name,))
+
+    def find_by_slug(self, slug):
+        row = self.conn.execute(f'SELECT {COLUMNS} FROM characters WHERE slug = ? LIMIT 1',
+                                (slug,)).fetchone()
+        return self._to_character(row) if row else None
+
+    def exists_by_slug(self, slug):
+        return self.find_by_slug(slug) is not None
+
+    def find_by_type(self, char_type):
+        return self._query(
+            f'SELECT {COLUMNS} FROM characters WHERE type = ? ORDER BY id', (char_type,))
+
+    def iter_page(self, sort='id', start=0, size=20, descending=False, after=None):
+        """Сторінка через ORDER BY ... LIMIT; курсор after - умова WHERE за індексом (без OFFSET)"""
+        column = SORT_COLUMNS[sort]
+        direction = 'DESC' if descending else 'ASC'
+        order = f'{column} {direction}' if sort == 'id' else f'{column} {direction}, id {direction}'
+        compare = '<' if descending else '>'
+
+        sql = f'SELECT {COLUMNS} FROM characters'
+        params = []
+        if after is not None:
+            if sort == 'id':
+                sql += f' WHERE id {compare} ?'
+                params.append(after)
+            else:
+                # Порівняння пар (значення, id) - як у ключі сортування
+                sql += (f' WHERE ({column}, id) {compare} '
+                        f'(SELECT {sort}, id FROM characters WHERE id = ?)')
+                params.append(after)
+            start = 0
+
+        sql += f' ORDER BY {order} LIMIT ? OFFSET ?'
+        params.extend((size, start))
+        for row in self.conn.execute(sql, params):
+            yield self._to_character(row)
+
+    @staticmethod
+    def _like_pattern(text):
+        escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        return f"%{escaped}%"
+
+    def query(self, character_filter):
+        """
+        Тип і діапазони здоров'я / атаки відбираються в SQL за індексами,
+        остаточна перевірка (частина імені, стихія, зброя) - CharacterFilter.matches
+        """
+        f = character_filter
+        where = []
+        params = []
+
+        # NOCASE і LIKE не враховують регістр лише для ASCII - інакше покладаємося на matches()
+        if f.char_type is not None and f.char_type.isascii():
+            where.append('type = ? COLLATE NOCASE')
+            params.append(f.char_type)
+        for part in (f.vision, f.weapon):
+            if part is not None and part.isascii():
+                where.append("type LIKE ? ESCAPE '\\'")
+                params.append(self._like_pattern(part))
+        for column, low, high in (('health', f.min_health, f.max_health),
+                                  ('attack', f.min_attack, f.max_attack)):
+            if low is not None:
+                where.append(f'{column} >= ?')
+                params.append(low)
+            if high is not None:
+                where.append(f'{column} <= ?')
+                params.append(high)
+
+        sql = f'SELECT {COLUMNS} FROM characters'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY id'
+        return [char for char in self._query(sql, params) if f.matches(char)]
+
+    def exists_by_name(self, name):
+        row = self.conn.execute(
+            'SELECT 1 FROM characters WHERE name = ? COLLATE NOCASE LIMIT 1', (name,)).fetchone()
+        return row is not None
@@ -0,0 +1,686 @@
+#storage.py
+import heapq
+import json
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from functools import lru_cache
+
+import config
+from metrics import metrics
+
+
+# === МОДЕЛЬ ДАНИХ ===
+class Character:
+    # Без __dict__ на кожен екземпляр - суттєво менше пам'яті на великих каталогах
+    __slots__ = ('id', 'name', 'type', 'health', 'attack', 'image_url', 'local_image_path', 'slug')
+
+    def __init__(self, id, name, char_type, health, attack, image_url="", local_image_path="", slug=""):
+        self.id = int(id)
+        self.name = name
+        # Типів небагато, тож однакові рядки зберігаються в одному екземплярі
+        # (null у записах API чи старого каталогу - порожній тип)
+        self.type = sys.intern(str(char_type or ''))
+        self.health = int(health)
+        self.attack = int(attack)
+        self.image_url = image_url
+        self.local_image_path = local_image_path
+        # Ідентифікатор персонажа в API ('ayaka', 'traveler-anemo'); '' - доданий вручну
+        self.slug = slug
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'type': self.type,
+            'health': self.health,
+            'attack': self.attack,
+            'image_url': self.image_url,
+            'local_image_path': self.local_image_path,
+            'slug': self.slug
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Створення персонажа зі словника, отриманого з to_dict()"""
+        return cls(
+            id=data['id'],
+            name=data['name'],
+            char_type=data.get('type', ''),
+            health=data.get('health', 0),
+            attack=data.get('attack', 0),
+            image_url=data.get('image_url', ''),
+            local_image_path=data.get('local_image_path', ''),
+            slug=data.get('slug', '')
+        )
+
+
+def normalize_name(name):
+    """Ключ для пошуку за ім'ям: без регістру та зайвих пробілів"""
+    return ' '.join(name.split()).casefold()
+
+
+@lru_cache(maxsize=None)
+def split_type(char_type):
+    """
+    'Pyro (Polearm)' -> ('pyro', 'polearm').
+    Тип без дужок (додані вручну персонажі) - стихія = весь тип, зброя = ''.
+    Типів небагато, тож результат кешується.
+    """
+    char_type = char_type.strip()
+    if char_type.endswith(')') and ' (' in char_type:
+        vision, weapon = char_type[:-1].rsplit(' (', 1)
+        return normalize_name(vision), normalize_name(weapon)
+    return normalize_name(char_type), ''
+
+
+# Ключі сортування списку; ID додається, щоб порядок був однозначним
+SORT_KEYS = {
+    'id': lambda c: (c.id,),
+    'name': lambda c: (normalize_name(c.name), c.id),
+    'health': lambda c: (c.health, c.id),
+    'attack': lambda c: (c.attack, c.id),
+}
+
+
+# === УМОВИ ПОШУКУ ===
+class CharacterFilter:
+    """
+    Умови пошуку персонажів; незадані (None) умови не перевіряються.
+    name - частина імені, char_type / vision / weapon - точний збіг без регістру,
+    health / attack - діапазони (min, max) з необов'язковими межами.
+    """
+
+    def __init__(self, name=None, char_type=None, vision=None, weapon=None,
+                 min_health=None, max_health=None, min_attack=None, max_attack=None):
+        self.name = normalize_name(name) if name else None
+        self.char_type = normalize_name(char_type) if char_type else None
+        self.vision = normalize_name(vision) if vision else None
+        self.weapon = normalize_name(weapon) if weapon else None
+        self.min_health = min_health
+        self.max_health = max_health
+        self.min_attack = min_attack
+        self.max_attack = max_attack
+
+    def is_empty(self):
+        return all(value is None for value in vars(self).values())
+
+    def matches(self, char):
+        if self.name is not None and self.name not in normalize_name(char.name):
+            return False
+        if self.char_type is not None and normalize_name(char.type) != self.char_type:
+            return False
+        vision, weapon = split_type(char.type)
+        if self.vision is not None and vision != self.vision:
+            return False
+        if self.weapon is not None and weapon != self.weapon:
+            return False
+        if self.min_health is not None and char.health < self.min_health:
+            return False
+        if self.max_health is not None and char.health > self.max_health:
+            return False
+        if self.min_attack is not None and char.attack < self.min_attack:
+            return False
+        if self.max_attack is not None and char.attack > self.max_attack:
+            return False
+        return True
+
+
+def write_json_atomic(filename, data, indent=None):
+    """
+    Запис JSON через тимчасовий файл + os.replace:
+    при збої посеред запису старий файл залишається цілим
+    """
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+
+
+# === ІНТЕРФЕЙС СХОВИЩА ===
+class IStorage:
+    """
+    Спільна поверхня всіх сховищ: load / save / add_character / get_all / get_by_id
+    + пакетний режим, у якому запис на диск відкладається до кінця пакета.
+    """
+
+    def __init__(self):
+        # Пакетний режим: поки _batch_depth > 0, запис на диск відкладається
+        self._batch_depth = 0
+        self._dirty = False
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self):
+        raise NotImplementedError
+
+    def add_character(self, character):
+        raise NotImplementedError
+
+    def update_character(self, character):
+        raise NotImplementedError
+
+    def delete_by_id(self, char_id):
+        raise NotImplementedError
+
+    def get_all(self):
+        raise NotImplementedError
+
+    def get_by_id(self, char_id):
+        raise NotImplementedError
+
+    def iter_all(self):
+        """Перебір каталогу (сховища можуть віддавати персонажів порціями)"""
+        return iter(self.get_all())
+
+    def count(self):
+        """Кількість персонажів"""
+        return len(self.get_all())
+
+    def max_id(self):
+        """Найбільший ID у каталозі (0, якщо каталог порожній)"""
+        return max((c.id for c in self.get_all()), default=0)
+
+    def find_by_name(self, name):
+        """Персонажі з таким ім'ям (без урахування регістру)"""
+        key = normalize_name(name)
+        return [c for c in self.get_all() if normalize_name(c.name) == key]
+
+    def exists_by_name(self, name):
+        """Чи є в каталозі персонаж з таким ім'ям"""
+        return bool(self.find_by_name(name))
+
+    def find_by_type(self, char_type):
+        """Персонажі заданого типу"""
+        return [c for c in self.get_all() if c.type == char_type]
+
+    def find_by_slug(self, slug):
+        """Персонаж з таким ідентифікатором API (або None)"""
+        return next((c for c in self.iter_all() if c.slug == slug), None)
+
+    def exists_by_slug(self, slug):
+        """Чи є в каталозі персонаж з таким ідентифікатором API"""
+        return self.find_by_slug(slug) is not None
+
+    def iter_page(self, sort='id', start=0, size=20, descending=False, after=None):
+        """
+        Одна сторінка каталогу в порядку sort (ключ з SORT_KEYS).
+        after - ID персонажа, після якого продовжити (курсор; start тоді ігнорується).
+        У пам'яті тримаються лише start + size найменших записів, а не весь каталог.
+        """
+        key = SORT_KEYS[sort]
+        chars = self.iter_all()
+        if after is not None:
+            cursor = self.get_by_id(after)
+            if cursor is None:
+                return
+            cursor_key = key(cursor)
+            if descending:
+                chars = (c for c in chars if key(c) < cursor_key)
+            else:
+                chars = (c for c in chars if key(c) > cursor_key)
+            start = 0
+
+        select = heapq.nlargest if descending else heapq.nsmallest
+        yield from select(start + size, chars, key=key)[start:]
+
+    def query(self, character_filter):
+        """Персонажі, що відповідають CharacterFilter (у порядку ID)"""
+        return sorted((c for c in self.iter_all() if character_filter.matches(c)),
+                      key=lambda c: c.id)
+
+    def flush(self):
+        """Записує відкладені зміни (якщо вони є) одним записом"""
+        if self._dirty:
+            self.save()
+
+    def close(self):
+        """Завершення роботи зі сховищем"""
+        self.flush()
+
+    def begin_batch(self):
+        """Початок пакета (для випадків, коли пакет не вміщується в один блок with)"""
+        self._batch_depth += 1
+
+    def end_batch(self):
+        """Кінець пакета: зовнішній пакет записує всі зміни"""
+        self._batch_depth -= 1
+        if not self._batch_depth:
+            self._commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Відкладає збереження до виходу з блоку:
+            with storage.batch():
+                storage.add_character(...)
+        Вкладені блоки дозволені - запис виконує зовнішній.
+        """
+        self.begin_batch()
+        try:
+            yield self
+        finally:
+            self.end_batch()
+
+    def _changed(self, op, data):
+        """
+        Реєстрація зміни: op - 'add' / 'update' / 'delete',
+        data - персонаж (або ID для 'delete')
+        """
+        self._dirty = True
+        if not self._batch_depth:
+            self._commit()
+
+    def _commit(self):
+        """Запис відкладених змін з вимірюванням тривалості"""
+        if self._dirty:
+            with metrics.timer('storage.save_ms'):
+                self.flush()
+
+    def add_many(self, characters):
+        """Додає кількох персонажів з одним записом на диск"""
+        with self.batch():
+            for character in characters:
+                self.add_character(character)
+
+
+# === ЗБЕРЕЖЕННЯ ДАНИХ ===
+class DataStorage(IStorage):
+    """
+    Каталог у пам'яті з індексами:
+    id -> Character (він же основне сховище, зберігає порядок додавання)
+    нормалізоване ім'я -> ID персонажів з таким ім'ям
+    ідентифікатор API (slug) -> ID персонажа
+    тип / стихія / зброя -> ID персонажів (інвертовані індекси для query)
+    здоров'я / атака -> відсортовані пари (значення, ID) для діапазонів
+    Ключі, під якими персонажа проіндексовано, запам'ятовуються окремо:
+    об'єкт могли змінити на місці ще до update_character.
+    """
+
+    def __init__(self, filename='characters.json'):
+        super().__init__()
+        self.filename = filename
+        self._by_id = {}
+        self._by_name = {}
+        self._by_slug = {}
+        self._by_type = {}
+        self._by_vision = {}
+        self._by_weapon = {}
+        self._by_health = []
+        self._by_attack = []
+        self._keys = {}
+        self._max_id = 0
+        self._build_indexes(self.load())
+
+    def _build_indexes(self, characters):
+        characters = list(characters)
+        self._max_id = max((c.id for c in characters), default=0)
+
+        for char in characters:
+            # Дублікати ID (з попередніх версій каталогу) отримують нові ID
+            if char.id in self._by_id:
+                self._max_id += 1
+                char.id = self._max_id
+                self._dirty = True
+            self._index(char, keep_sorted=False)
+
+        # Одне сортування замість вставки кожного значення
+        self._by_health.sort()
+        self._by_attack.sort()
+
+    @staticmethod
+    def _add_key(index, key, char_id):
+        index.setdefault(key, {})[char_id] = None
+
+    @staticmethod
+    def _remove_key(index, key, char_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.pop(char_id, None)
+            if not ids:
+                del index[key]
+
+    @staticmethod
+    def _insert_sorted(index, item):
+        pos = bisect_left(index, item)
+        if pos == len(index) or index[pos] != item:
+            index.insert(pos, item)
+
+    @staticmethod
+    def _remove_sorted(index, item):
+        pos = bisect_left(index, item)
+        if pos < len(index) and index[pos] == item:
+            del index[pos]
+
+    def _index(self, char, keep_sorted=True):
+        # Заміна значення в dict зберігає позицію персонажа
+        self._by_id[char.id] = char
+        name, slug, char_type = normalize_name(char.name), char.slug, normalize_name(char.type)
+        vision, weapon = split_type(char.type)
+        self._keys[char.id] = (name, slug, char_type, vision, weapon, char.health, char.attack)
+
+        self._add_key(self._by_name, name, char.id)
+        if slug:
+            self._by_slug[slug] = char.id
+
+        self._add_key(self._by_type, char_type, char.id)
+        self._add_key(self._by_vision, vision, char.id)
+        self._add_key(self._by_weapon, weapon, char.id)
+
+        if keep_sorted:
+            self._insert_sorted(self._by_health, (char.health, char.id))
+            self._insert_sorted(self._by_attack, (char.attack, char.id))
+        else:
+            self._by_health.append((char.health, char.id))
+            self._by_attack.append((char.attack, char.id))
+
+        self._max_id = max(self._max_id, char.id)
+
+    def _unindex(self, char_id):
+        """Прибирає персонажа з усіх індексів, крім _by_id, за збереженими ключами"""
+        name, slug, char_type, vision, weapon, health, attack = self._keys.pop(char_id)
+
+        self._remove_key(self._by_name, name, char_id)
+        if slug and self._by_slug.get(slug) == char_id:
+            del self._by_slug[slug]
+
+        self._remove_key(self._by_type, char_type, char_id)
+        self._remove_key(self._by_vision, vision, char_id)
+        self._remove_key(self._by_weapon, weapon, char_id)
+
+        self._remove_sorted(self._by_health, (health, char_id))
+        self._remove_sorted(self._by_attack, (attack, char_id))
+
+    @property
+    def characters(self):
+        return list(self._by_id.values())
+
+    def load(self):
+        if os.path.exists(self.filename):
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                # object_hook перетворює кожен запис одразу, без списку проміжних dict
+                return json.load(f, object_hook=Character.from_dict)
+        return []
+
+    def save(self):
+        write_json_atomic(self.filename, [char.to_dict() for char in self._by_id.values()], indent=2)
+        self._dirty = False
+
+    def add_character(self, character):
+        if character.id in self._by_id:
+            raise ValueError(f"Персонаж з ID {character.id} вже існує")
+        self._index(character)
+        self._changed('add', character)
+
+    def update_character(self, character):
+        """Замінює персонажа з тим самим ID. Повертає True, якщо його знайдено"""
+        if character.id not in self._by_id:
+            return False
+        # Навіть якщо це той самий (змінений) об'єкт - старі ключі беремо з _keys
+        self._unindex(character.id)
+        self._index(character)
+        self._changed('update', character)
+        return True
+
+    def delete_by_id(self, char_id):
+        """Видаляє персонажа за ID. Повертає True, якщо персонажа знайдено"""
+        if char_id not in self._by_id:
+            return False
+        self._unindex(char_id)
+        del self._by_id[char_id]
+        self._changed('delete', char_id)
+        return True
+
+    def get_all(self):
+        return self.characters
+
+    def get_by_id(self, char_id):
+        return self._by_id.get(char_id)
+
+    def count(self):
+        return len(self._by_id)
+
+    def max_id(self):
+        return self._max_id
+
+    def find_by_name(self, name):
+        ids = self._by_name.get(normalize_name(name), ())
+        return [self._by_id[char_id] for char_id in ids]
+
+    def exists_by_name(self, name):
+        return normalize_name(name) in self._by_name
+
+    def find_by_slug(self, slug):
+        char_id = self._by_slug.get(slug)
+        return None if char_id is None else self._by_id[char_id]
+
+    def exists_by_slug(self, slug):
+        return slug in self._by_slug
+
+    def find_by_type(self, char_type):
+        ids = self._by_type.get(normalize_name(char_type), ())
+        return [self._by_id[char_id] for char_id in ids if self._by_id[char_id].type == char_type]
+
+    def iter_page(self, sort='id', start=0, size=20, descending=False, after=None):
+        """Для здоров'я та атаки сторінка береться прямо з відсортованого індексу"""
+        index = {'health': self._by_health, 'attack': self._by_attack}.get(sort)
+        if index is None:
+            yield from super().iter_page(sort, start, size, descending, after)
+            return
+
+        if after is not None:
+            cursor = self._by_id.get(after)
+            if cursor is None:
+                return
+            item = (getattr(cursor, sort), cursor.id)
+            # Перша позиція після курсора (у зворотному порядку - перед ним)
+            start = len(index) - bisect_left(index, item) if descending else bisect_right(index, item)
+
+        if descending:
+            positions = range(len(index) - 1 - start, max(len(index) - start - size, 0) - 1, -1)
+        else:
+            positions = range(start, min(start + size, len(index)))
+        for pos in positions:
+            yield self._by_id[index[pos][1]]
+
+    @staticmethod
+    def _range_bounds(index, low, high):
+        """Межі [start, end) пар зі значеннями в [low, high] у відсортованому індексі"""
+        start = 0 if low is None else bisect_left(index, (low,))
+        # (high + 1,) - перша пара, більша за будь-яку (high, id)
+        end = len(index) if high is None else bisect_left(index, (high + 1,))
+        return start, end
+
+    def query(self, character_filter):
+        """
+        Пошук за індексами: кандидати беруться з найменшого джерела
+        (інвертований індекс або діапазон, розмір якого відомий з bisect),
+        решта інвертованих індексів перевіряється за O(1) на кандидата
+        """
+        f = character_filter
+        keys = [index.get(key, {}) for index, key in
+                ((self._by_type, f.char_type), (self._by_vision, f.vision), (self._by_weapon, f.weapon))
+                if key is not None]
+        ranges = [self._range_bounds(index, low, high) + (index,) for index, low, high in
+                  ((self._by_health, f.min_health, f.max_health),
+                   (self._by_attack, f.min_attack, f.max_attack))
+                  if low is not None or high is not None]
+
+        keys.sort(key=len)
+        ranges.sort(key=lambda r: r[1] - r[0])
+
+        if ranges and (not keys or ranges[0][1] - ranges[0][0] < len(keys[0])):
+            start, end, index = ranges[0]
+            ids = [char_id for _, char_id in index[start:end]]
+        elif keys:
+            ids = keys.pop(0)
+        else:
+            # Лише пошук за частиною імені - індекс тут не допоможе
+            ids = self._by_id.keys()
+
+        for other in keys:
+            ids = [char_id for char_id in ids if char_id in other]
+
+        # Точна перевірка: частина імені + захист від змінених "на місці" персонажів
+        result = [char for char in map(self._by_id.__getitem__, ids) if f.matches(char)]
+        result.sort(key=lambda c: c.id)
+        return result
+
+
+# === СХОВИЩЕ З ЖУРНАЛОМ ЗМІН ===
+class JournalDataStorage(DataStorage):
+    """
+    Знімок characters.json + журнал змін (JSON Lines).
+    Кожна зміна дописується в кінець журналу, а не перезаписує весь файл.
+    Коли журнал перевищує поріг, у фоновому потоці створюється новий знімок.
+    """
+
+    def __init__(self, filename='characters.json', journal_filename=None, compact_threshold=None):
+        self.journal_filename = journal_filename or f"{filename}.journal"
+        # Журнал, який зараз "вливається" у знімок фоновим потоком
+        self.compacting_filename = f"{self.journal_filename}.compacting"
+        self.compact_threshold = compact_threshold or config.JOURNAL_COMPACT_BYTES
+        self._pending = []
+        self._compaction_thread = None
+        self._journal_valid_bytes = 0
+        self._lock = threading.Lock()
+        super().__init__(filename)
+
+        # Відрізаємо обрізаний хвіст, щоб нові записи не склеїлись з ним
+        if os.path.exists(self.journal_filename):
+            os.truncate(self.journal_filename, self._journal_valid_bytes)
+        self._journal = open(self.journal_filename, 'a', encoding='utf-8')
+
+        # Попереднє ущільнення не завершилось або дублікати ID отримали нові ID -
+        # записуємо новий знімок
+        if self._dirty or os.path.exists(self.compacting_filename):
+            self.save()
+
+    def _build_indexes(self, characters):
+        """Знімок (дублікати ID перенумеровує DataStorage) + незавершене ущільнення + журнал"""
+        super()._build_indexes(characters)
+
+        self._replay(self.compacting_filename)
+        self._journal_valid_bytes = self._replay(self.journal_filename)
+
+    def _replay(self, journal):
+        """
+        Повторює записи журналу. Повтор ідемпотентний: 'add' працює як upsert.
+        Повертає довжину (в байтах) коректної частини журналу.
+        """
+        valid_bytes = 0
+        if not os.path.exists(journal):
+            return valid_bytes
+
+        with open(journal, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError
+                    record = json.loads(line)
+                except ValueError:
+                    # Обрізаний останній рядок після аварійного завершення
+                    break
+
+                if record['op'] == 'delete':
+                    if record['id'] in self._by_id:
+                        self._unindex(record['id'])
+                        del self._by_id[record['id']]
+                else:
+                    char = Character.from_dict(record['character'])
+                    if char.id in self._by_id:
+                        self._unindex(char.id)
+                    self._index(char)
+                valid_bytes += len(line)
+
+        return valid_bytes
+
+    def _changed(self, op, data):
+        if op == 'delete':
+            record = {'op': op, 'id': data}
+        else:
+            record = {'op': op, 'character': data.to_dict()}
+
+        self._pending.append(json.dumps(record, ensure_ascii=False))
+        super()._changed(op, data)
+
+    def flush(self):
+        """Дописує накопичені записи в журнал з одним fsync на пакет"""
+        if not self._pending:
+            return
+
+        self._journal.write('\n'.join(self._pending) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._pending = []
+        self._dirty = False
+
+        if self._journal.tell() >= self.compact_threshold:
+            self._start_compaction()
+
+    def _start_compaction(self):
+        """Перемикає журнал і запускає запис знімка у фоновому потоці"""
+        with self._lock:
+            if self._compaction_thread and self._compaction_thread.is_alive():
+                return
+
+            if os.path.exists(self.compacting_filename):
+                # Попередній фоновий знімок не вдався: новий перенос журналу затер би
+                # ще не влиті записи, тож ущільнюємо синхронно. Якщо й це не вдається -
+                # журнал не переноситься і просто росте далі (дані в ньому цілі)
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"Помилка ущільнення журналу: {e}")
+                    metrics.inc('storage.compaction_errors')
+                return
+
+            rows = [char.to_dict() for char in self.characters]
+
+            self._journal.close()
+            os.replace(self.journal_filename, self.compacting_filename)
+            self._journal = open(self.journal_filename, 'a', encoding='utf-8')
+
+            self._compaction_thread = threading.Thread(
+                target=self._write_snapshot, args=(rows,), daemon=True)
+            self._compaction_thread.start()
+
+    def _write_snapshot(self, rows):
+        try:
+            write_json_atomic(self.filename, rows)
+        except Exception as e:
+            # .compacting лишається на диску - його записи влиє наступне ущільнення
+            print(f"Помилка фонового ущільнення журналу: {e}")
+            metrics.inc('storage.compaction_errors')
+            return
+        # Знімок уже містить усі записи старого журналу
+        os.remove(self.compacting_filename)
+
+    def _wait_for_compaction(self):
+        thread = self._compaction_thread
+        if thread:
+            thread.join()
+
+    def save(self):
+        """Синхронне ущільнення: новий знімок і порожній журнал"""
+        self._wait_for_compaction()
+
+        write_json_atomic(self.filename, [char.to_dict() for char in self.characters])
+
+        self._journal.close()
+        self._journal = open(self.journal_filename, 'w', encoding='utf-8')
+        if os.path.exists(self.compacting_filename):
+            os.remove(self.compacting_filename)
+
+        self._pending = []
+        self._dirty = False
+
+    def close(self):
+        self.flush()
+        self._wait_for_compaction()
+        self._journal.close()
@@ -0,0 +1,150 @@
+#stub_server.py
+import argparse
+import hashlib
+import json
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+VISIONS = ('Anemo', 'Cryo', 'Dendro', 'Electro', 'Geo', 'Hydro', 'Pyro')
+WEAPONS = ('Bow', 'Catalyst', 'Claymore', 'Polearm', 'Sword')
+
+
+def make_png(size, seed):
+    """Однотонний PNG size x size; колір залежить від seed, тож зображення різні"""
+    color = bytes(((seed * 67) % 256, (seed * 131) % 256, (seed * 29) % 256))
+    raw = b''.join(b'\x00' + color * size for _ in range(size))
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) +
+            chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b''))
+
+
+def make_details(index):
+    """Дані персонажа у форматі genshin.jmp.blue"""
+    return {
+        'name': f"Stub{index:06d}",
+        'vision': VISIONS[index % len(VISIONS)],
+        'weapon': WEAPONS[index % len(WEAPONS)],
+        'rarity': 4 + index % 2
+    }
+
+
+# === ОБРОБНИК ЗАПИТІВ ===
+class StubAPIHandler(BaseHTTPRequestHandler):
+    """
+    /characters              - список імен
+    /characters/<ім'я>       - деталі (з ETag; If-None-Match -> 304)
+    /characters/<ім'я>/icon  - PNG
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        stub = self.server.stub
+        if stub.latency:
+            time.sleep(stub.latency)
+        stub.requests += 1
+
+        parts = [unquote(p) for p in self.path.split('?', 1)[0].strip('/').split('/')]
+        if parts == ['characters']:
+            return self._send_json(stub.names)
+
+        if len(parts) in (2, 3) and parts[0] == 'characters' and parts[1] in stub.index:
+            index = stub.index[parts[1]]
+            if len(parts) == 2:
+                return self._send_json(make_details(index))
+            if parts[2] == 'icon':
+                return self._send(200, make_png(stub.image_size, index), 'image/png')
+
+        self._send(404, b'{"error": "not found"}', 'application/json')
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode('utf-8')
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send(200, body, 'application/json', etag)
+
+    def _send(self, status, body, content_type, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# === ЛОКАЛЬНИЙ СЕРВЕР ЗАМІСТЬ GENSHIN.JMP.BLUE ===
+class StubServer:
+    """
+    Тестовий сервер API з налаштовуваною затримкою:
+        with StubServer(count=200, latency=0.02) as server:
+            client = GenshinAPIClient(base_url=server.url)
+    """
+
+    def __init__(self, count=100, latency=0.0, image_size=64, host='127.0.0.1', port=0):
+        self.names = [f"stub{i:06d}" for i in range(count)]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.latency = latency
+        self.image_size = image_size
+        self.requests = 0
+
+        self.httpd = ThreadingHTTPServer((host, port), StubAPIHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальний тестовий сервер API персонажів")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--count', type=int, default=100, help="кількість персонажів")
+    parser.add_argument('--latency', type=float, default=0.0, help="затримка відповіді, сек")
+    args = parser.parse_args()
+
+    server = StubServer(args.count, args.latency, port=args.port)
+    print(f"Тестовий API: {server.url} ({args.count} персонажів, затримка {args.latency} с)")
+    print(f"Запуск каталогу з ним: CATALOG_API_BASE_URL={server.url} python main.py")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()